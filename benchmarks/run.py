@@ -0,0 +1,190 @@
+# Benchmarks for each stage of the earnings pipeline on synthetic schedules.
+#
+#   python benchmarks/run.py                       # 10, 1k, 10k and 100k shifts
+#   python benchmarks/run.py --sizes 10 1000 --output bench_output.txt
+#
+# Every stage is timed (best of --repeat runs) and then run once more under tracemalloc for
+# its peak memory. Results are printed as one JSON object per line, so runs can be appended
+# to a file and compared over time.
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from nurse_wage.cache import LRUCache
+from nurse_wage.export import export_hours
+from nurse_wage.ics import iter_ics_work_periods, load_ics_work_periods
+from nurse_wage.overtime import apply_overtime
+from nurse_wage.pay import calculate_total_earnings, price_segments, split_work_periods, summarize_weeks
+from nurse_wage.reconcile import reconcile_pay_records
+from nurse_wage.rules import DifferentialRule, RuleTable, federal_holidays
+from nurse_wage.schedule import WorkPeriodIndex
+from nurse_wage.tax import calculate_period_tax, get_federal_tax_table
+from nurse_wage.views import build_calendar_html, get_daily_totals, prepare_chart_data, render_month_html
+
+DEFAULT_SIZES = [10, 1000, 10000, 100000]
+
+RATES = (34.45, 2.0, 16.0, 5.0, 50.0, "Percentage")
+
+# A larger rule table (twelve rules, holidays from 2024 to 2299) for comparing pricing cost
+# against the three built-in rules
+MANY_RULES = RuleTable([
+    DifferentialRule('night', 16.0, 23, 7),
+    DifferentialRule('evening', 8.0, 15, 23),
+    DifferentialRule('early', 4.0, 5, 7),
+    DifferentialRule('weekend', 5.0, weekdays=(5, 6), group='premium', priority=1),
+    DifferentialRule('weekend', 5.0, 19, weekdays=(4,), group='premium', priority=1),
+    DifferentialRule('holiday', 50.0, holidays=True, group='premium', priority=2),
+    DifferentialRule('on_call', 50.0, on_call=True),
+    DifferentialRule('on_call_night', 10.0, 23, 7, on_call=True),
+    DifferentialRule('monday', 2.0, weekdays=(0,)),
+    DifferentialRule('midweek', 1.0, 11, 13, weekdays=(2,)),
+    DifferentialRule('handover', 3.0, 6.5, 7.5),
+    DifferentialRule('weekday_evening', 2.0, 18, 23, weekdays=(0, 1, 2, 3), holidays=False),
+], federal_holidays(range(2024, 2300)))
+
+# Function to generate a schedule of non-overlapping shifts: 12 hour day or night shifts (some
+# cut to 8 hours), one to two half-day slots apart, about one in ten on call. The spacing is
+# tight so that 100k shifts still end before 2262, the last year pandas timestamps can hold.
+def make_schedule(shift_count, seed=0):
+    rng = random.Random(seed)
+    work_periods = []
+    slot_start = datetime(2024, 1, 1, 7)
+    for _ in range(shift_count):
+        length = rng.choice([12, 12, 12, 8])
+        work_periods.append((slot_start, slot_start + timedelta(hours=length), rng.random() < 0.1))
+        slot_start += timedelta(hours=12 * rng.choice([1, 1, 2]))
+    return work_periods
+
+# Function to write a schedule as .ics file bytes, one VEVENT per shift
+def make_ics(work_periods):
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//nurse_wage//benchmarks//EN"]
+    for i, (start, end, is_on_call) in enumerate(work_periods):
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:shift-{i}@benchmarks",
+            "DTSTAMP:20240101T000000Z",
+            f"DTSTART:{start:%Y%m%dT%H%M%S}",
+            f"DTEND:{end:%Y%m%dT%H%M%S}",
+            f"SUMMARY:{'On Call' if is_on_call else 'Shift'}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+# Function to build the stages for one schedule size. Each stage is (name, rows, function);
+# inputs are prepared up front so a stage only measures its own work.
+def build_stages(shift_count):
+    work_periods = make_schedule(shift_count)
+    ics_bytes = make_ics(work_periods)
+    segments = split_work_periods(work_periods)
+    rule_segments = split_work_periods(work_periods, MANY_RULES)
+    df_segments = price_segments(segments, *RATES)
+    df_overtime = apply_overtime(df_segments)
+    total_earnings, _, weekly_data, df_hours = calculate_total_earnings(work_periods, *RATES)
+    weekly_pay = [week['total_weekly_pay'] for week in weekly_data]
+    index = WorkPeriodIndex(work_periods)
+    probes = [(start + timedelta(hours=13), end + timedelta(hours=13)) for start, end, _ in work_periods]
+    daily_totals = get_daily_totals(df_hours)
+    # One pay record per hour-level row, like a paystub export with a line per shift
+    df_records = pd.DataFrame({'date': df_hours['datetime'], 'code': 'REG', 'amount': df_hours['regular_earnings'],
+                               'hours': df_hours['regular_hours']})
+    ics_cache = LRUCache(maxsize=1)
+    load_ics_work_periods(ics_bytes, cache=ics_cache)
+
+    # Rendering every month from scratch, as on the first view of a schedule
+    def calendar_uncached():
+        render_month_html.cache_clear()
+        return build_calendar_html(daily_totals)
+
+    def overlap():
+        for start, end in probes:
+            index.overlaps(start, end)
+
+    return [
+        ('ics_parse', len(work_periods), lambda: sum(1 for _ in iter_ics_work_periods(io.BytesIO(ics_bytes)))),
+        ('ics_cached_upload', len(work_periods), lambda: load_ics_work_periods(ics_bytes, cache=ics_cache)),
+        ('overlap_bulk_insert', len(work_periods), lambda: WorkPeriodIndex(work_periods)),
+        ('overlap_queries', len(probes), overlap),
+        ('segment_expansion', len(work_periods), lambda: split_work_periods(work_periods)),
+        ('segment_pricing', len(segments['datetime']), lambda: price_segments(segments, *RATES)),
+        ('segment_pricing_many_rules', len(rule_segments['datetime']),
+         lambda: price_segments(rule_segments, *RATES, rules=MANY_RULES)),
+        ('overtime', len(df_segments), lambda: apply_overtime(df_segments)),
+        ('weekly_grouping', len(df_overtime), lambda: summarize_weeks(df_overtime)),
+        ('calculate_total_earnings', len(work_periods), lambda: calculate_total_earnings(work_periods, *RATES)),
+        ('tax', len(weekly_pay), lambda: calculate_period_tax(weekly_pay, 52, get_federal_tax_table('Single'), 5.0)),
+        ('chart_data_prep', len(weekly_data), lambda: prepare_chart_data(weekly_data)),
+        ('export_parquet', len(df_hours), lambda: export_hours(df_hours, io.BytesIO(), 'Parquet')),
+        ('export_csv', len(df_hours), lambda: export_hours(df_hours, io.BytesIO(), 'CSV')),
+        ('reconcile', len(df_records), lambda: reconcile_pay_records(df_records, df_hours)),
+        ('calendar_html', len(daily_totals), calendar_uncached),
+        ('calendar_html_cached', len(daily_totals), lambda: build_calendar_html(daily_totals)),
+    ]
+
+# Function to time a stage (best of repeat runs) and measure its peak traced memory
+def measure(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='numbers of shifts')
+    parser.add_argument('--stages', nargs='+', help='only run these stages')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage; the best is kept')
+    parser.add_argument('--output', help='append results to this file instead of printing them')
+    args = parser.parse_args(argv)
+
+    run_info = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+    }
+    output = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        for shift_count in args.sizes:
+            for stage, rows, function in build_stages(shift_count):
+                if args.stages and stage not in args.stages:
+                    continue
+                result = dict(run_info, stage=stage, shifts=shift_count, rows=rows)
+                seconds, peak_bytes = measure(function, args.repeat)
+                result.update(seconds=round(seconds, 6), peak_bytes=peak_bytes)
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,34 @@
+# Headless core of the nurse wage calculator, usable without Streamlit.
+# Names are imported from their submodule on first use, and pandas, numpy, icalendar and
+# dateutil are only imported inside the functions that need them, so `import nurse_wage`
+# stays cheap for short-lived batch jobs.
+import importlib
+
+_exports = {
+    'LRUCache': 'nurse_wage.cache',
+    'iter_ics_work_periods': 'nurse_wage.ics',
+    'apply_overtime': 'nurse_wage.overtime',
+    'calculate_total_earnings': 'nurse_wage.pay',
+    'determine_shift_differential': 'nurse_wage.pay',
+    'reconcile_pay_records': 'nurse_wage.reconcile',
+    'WorkPeriodIndex': 'nurse_wage.schedule',
+    'iter_rotation_periods': 'nurse_wage.schedule',
+    'ScheduleStore': 'nurse_wage.store',
+    'calculate_federal_tax': 'nurse_wage.tax',
+    'calculate_period_tax': 'nurse_wage.tax',
+    'federal_tax_brackets': 'nurse_wage.tax',
+    'get_federal_tax_table': 'nurse_wage.tax',
+    'state_tax_rates': 'nurse_wage.tax',
+    'calculate_unit_earnings': 'nurse_wage.unit',
+    'import_unit_schedules': 'nurse_wage.unit',
+}
+
+__all__ = list(_exports)
+
+# Function to import the module of an exported name the first time the name is used
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module 'nurse_wage' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name]), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,5 @@
+import sys
+
+from nurse_wage.cli import main
+
+sys.exit(main())
@@ -0,0 +1,46 @@
+# Caching helpers
+import threading
+from collections import OrderedDict
+
+# Bounded, thread-safe least-recently-used cache that counts hits and misses. Besides the
+# number of entries, the total size of the values can be bounded: with maxbytes set, sizeof
+# gives each value's size in bytes, and the least recently used entries are evicted until the
+# total fits. A value larger than maxbytes on its own is not cached.
+class LRUCache:
+    def __init__(self, maxsize=1024, maxbytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                del self._data[key]
+                self.nbytes -= self._sizes.pop(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return
+            self._data[key] = value
+            self._sizes[key] = size
+            self.nbytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes):
+                evicted, _ = self._data.popitem(last=False)
+                self.nbytes -= self._sizes.pop(evicted)
@@ -0,0 +1,185 @@
+# Command-line entry point: estimate earnings from an .ics file without starting Streamlit
+#
+#   python -m nurse_wage schedule.ics --hourly-rate 34.45 --state California
+#
+# Rate settings can also come from a JSON file (--config) whose keys are the option names,
+# e.g. {"hourly_rate": 34.45, "night_differential": 16, "daily_overtime": ["8:1.5", "12:2"]}.
+# Options given on the command line override the file.
+import argparse
+import json
+import sys
+
+from nurse_wage.export import export_format_for_path, export_hours, export_weeks
+from nurse_wage.ics import DEFAULT_ON_CALL_KEYWORD, iter_ics_work_periods
+from nurse_wage.pay import calculate_total_earnings
+from nurse_wage.reconcile import read_pay_records, reconcile_pay_records
+from nurse_wage.rules import rule_table_from_config
+from nurse_wage.schedule import WorkPeriodIndex
+from nurse_wage.tax import calculate_period_tax, federal_tax_brackets, get_federal_tax_table, state_tax_rates
+
+# Function to parse a daily overtime rule written as HOURS:MULTIPLIER, e.g. 8:1.5
+def parse_daily_overtime_rule(text):
+    try:
+        threshold, multiplier = text.split(':')
+        return float(threshold), float(multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected HOURS:MULTIPLIER, got {text!r}")
+
+# Function to build the command-line argument parser
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m nurse_wage',
+        description='Estimate nursing earnings from an .ics work schedule.',
+    )
+    parser.add_argument('ics_file', help='work schedule exported as .ics')
+    parser.add_argument('--config', help='JSON file with rate settings')
+    parser.add_argument('--on-call-keyword', default=DEFAULT_ON_CALL_KEYWORD,
+                        help='events whose summary contains this are on call (default: %(default)s)')
+    parser.add_argument('--hourly-rate', type=float, default=34.45)
+    parser.add_argument('--charge-nurse-pay', type=float, default=0.0)
+    parser.add_argument('--night-differential', type=float, default=16.0)
+    parser.add_argument('--weekend-differential', type=float, default=5.0)
+    parser.add_argument('--on-call-differential', type=float, default=50.0)
+    parser.add_argument('--differential-type', choices=['Percentage', 'Dollar Amount'], default='Percentage')
+    parser.add_argument('--rules', metavar='PATH',
+                        help='JSON rule table replacing the night, weekend and on-call differentials')
+    parser.add_argument('--week-start-day', type=int, choices=range(7), default=0,
+                        help='0 = Monday ... 6 = Sunday')
+    parser.add_argument('--weekly-overtime-hours', type=float, default=40.0)
+    parser.add_argument('--daily-overtime', type=parse_daily_overtime_rule, action='append', default=[],
+                        metavar='HOURS:MULTIPLIER', help='daily overtime rule, may be repeated')
+    parser.add_argument('--workday-start-hour', type=int, choices=range(24), default=0, metavar='HOUR',
+                        help='hour (0-23) at which workdays and workweeks begin, e.g. 19 to count a '
+                             'night shift as one workday (default: %(default)s)')
+    parser.add_argument('--filing-status', choices=list(federal_tax_brackets), default='Single')
+    parser.add_argument('--state', choices=sorted(state_tax_rates), default=None)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--export-hours', metavar='PATH',
+                        help='write hour-level rows to a .parquet, .arrow or .csv file')
+    parser.add_argument('--export-weeks', metavar='PATH',
+                        help='write the weekly summary to a .parquet, .arrow or .csv file')
+    parser.add_argument('--reconcile', metavar='PATH',
+                        help='compare against actual pay records (.csv, .parquet or .arrow with date, '
+                             'code, amount and optional hours columns)')
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help='largest pay difference in dollars not reported by --reconcile (default: %(default)s)')
+    return parser
+
+# Function to parse arguments, using values from --config as defaults
+def parse_args(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.config:
+        try:
+            with open(args.config) as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not read config {args.config}: {e}")
+        config = {key.replace('-', '_'): value for key, value in config.items()}
+        if 'daily_overtime' in config:
+            config['daily_overtime'] = [parse_daily_overtime_rule(str(rule)) for rule in config['daily_overtime']]
+        parser.set_defaults(**config)
+        args = parser.parse_args(argv)
+    for path in (args.export_hours, args.export_weeks):
+        if path:
+            try:
+                export_format_for_path(path)
+            except ValueError as e:
+                parser.error(str(e))
+    return args
+
+# Function to run the command line; returns the exit status
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        with open(args.ics_file, 'rb') as f:
+            work_periods = WorkPeriodIndex(iter_ics_work_periods(f, on_call_keyword=args.on_call_keyword))
+    except OSError as e:
+        print(f"Could not read {args.ics_file}: {e}", file=sys.stderr)
+        return 1
+    if not work_periods:
+        print(f"No work periods found in {args.ics_file}.", file=sys.stderr)
+        return 1
+
+    rules = None
+    if args.rules:
+        years = range(work_periods[0][0].year, work_periods[-1][1].year + 1)
+        try:
+            with open(args.rules) as f:
+                rules = rule_table_from_config(json.load(f), years)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Could not read rules {args.rules}: {e}", file=sys.stderr)
+            return 1
+
+    total_earnings, total_hours, weekly_data, df_hours = calculate_total_earnings(
+        work_periods, args.hourly_rate, args.charge_nurse_pay, args.night_differential,
+        args.weekend_differential, args.on_call_differential, args.differential_type,
+        args.week_start_day, args.weekly_overtime_hours, args.daily_overtime, args.workday_start_hour,
+        rules=rules,
+    )
+
+    for path, export, table in ((args.export_hours, export_hours, df_hours),
+                                (args.export_weeks, export_weeks, weekly_data)):
+        if path:
+            try:
+                with open(path, 'wb') as f:
+                    export(table, f, export_format_for_path(path))
+            except OSError as e:
+                print(f"Could not write {path}: {e}", file=sys.stderr)
+                return 1
+
+    df_reconciled = None
+    if args.reconcile:
+        try:
+            df_reconciled = reconcile_pay_records(read_pay_records(args.reconcile), df_hours,
+                                                  args.week_start_day, args.workday_start_hour, args.tolerance)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Could not reconcile {args.reconcile}: {e}", file=sys.stderr)
+            return 1
+        df_discrepancies = df_reconciled[df_reconciled['flagged']]
+
+    weeks_in_period = (weekly_data[-1]['week_start'] - weekly_data[0]['week_start']).days // 7 + 1
+    state_tax_rate = state_tax_rates[args.state] if args.state else 0.0
+    federal_tax, state_tax = calculate_period_tax(
+        total_earnings, 52 / weeks_in_period, get_federal_tax_table(args.filing_status), state_tax_rate
+    )
+    federal_tax = float(federal_tax)
+    state_tax = float(state_tax)
+
+    if args.json:
+        result = {
+            'total_hours': float(total_hours),
+            'total_earnings': float(total_earnings),
+            'federal_tax': federal_tax,
+            'state_tax': state_tax,
+            'post_tax_earnings': float(total_earnings) - federal_tax - state_tax,
+            'weeks': [
+                {key: (value.isoformat() if hasattr(value, 'isoformat') else value)
+                 for key, value in week.items()}
+                for week in weekly_data
+            ],
+        }
+        if df_reconciled is not None:
+            result['discrepancies'] = json.loads(df_discrepancies.drop(columns='flagged').to_json(orient='records'))
+        json.dump(result, sys.stdout, indent=2, default=float)
+        print()
+        return 0
+
+    for week in weekly_data:
+        print(f"Week of {week['week_start']:%b %d %Y}: {week['regular_hours']:g} regular hours, "
+              f"{week['overtime_hours']:g} overtime hours, ${week['total_weekly_pay']:.2f}")
+    print(f"Total hours worked: {round(total_hours, 2):g} hours")
+    print(f"Total pre-tax earnings: ${total_earnings:.2f}")
+    print(f"Federal tax ({args.filing_status}, {weeks_in_period} week period): ${federal_tax:.2f}")
+    if args.state:
+        print(f"State tax ({args.state}): ${state_tax:.2f}")
+    print(f"Total post-tax earnings: ${total_earnings - federal_tax - state_tax:.2f}")
+    if df_reconciled is not None:
+        print(f"Pay records: {len(df_discrepancies)} of {len(df_reconciled)} week/category amounts differ "
+              f"from the expected pay")
+        for row in df_discrepancies.itertuples():
+            hours = f", {row.hours_difference:+g} hours" if row.hours_difference == row.hours_difference else ""
+            print(f"  Week of {row.week} {row.category}: expected ${row.expected_amount:.2f}, "
+                  f"paid ${row.actual_amount:.2f} ({row.difference:+.2f}{hours})")
+    return 0
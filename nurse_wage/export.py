@@ -0,0 +1,119 @@
+# Columnar export of the hour-level segments and the weekly summary as Parquet, Arrow IPC or CSV.
+# Tables are converted to compact dtypes and written a chunk of rows at a time, so a large
+# export never holds more than one converted chunk (or one chunk of CSV text) in memory.
+# pyarrow is only needed for Parquet and Arrow IPC.
+import io
+import os
+
+# Rows converted and written per chunk
+EXPORT_CHUNK_ROWS = 65536
+
+# File formats: (file suffix, MIME type)
+export_formats = {
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'Arrow IPC': ('.arrow', 'application/vnd.apache.arrow.file'),
+    'CSV': ('.csv', 'text/csv'),
+}
+
+# Money columns, exported as whole cents so totals add up exactly. Differential columns of a
+# custom rule table (<name>_diff_pay) are exported the same way.
+pay_columns = ['base_pay', 'charge_nurse_pay', 'night_diff_pay', 'weekend_diff_pay', 'on_call_diff_pay',
+               'total_hourly_rate', 'pay', 'regular_earnings', 'overtime_earnings', 'total_weekly_pay']
+
+# Hour columns, exported as float32 (hours are kept to the minute, well within float32 precision)
+hour_columns = ['hours', 'regular_hours', 'overtime_hours', 'overtime_paid_hours']
+
+# Shift types of a segment, exported as a categorical instead of repeated strings
+shift_types = ['Day', 'Night']
+
+# Function to find the export format for a file name from its suffix
+def export_format_for_path(path):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == '.feather':
+        return 'Arrow IPC'
+    for file_format, (format_suffix, _) in export_formats.items():
+        if suffix == format_suffix:
+            return file_format
+    raise ValueError(f"Unknown export format for {path!r}; use one of "
+                     f"{', '.join(suffix for suffix, _ in export_formats.values())}")
+
+# Function to list the money columns of a frame, in export order
+def money_columns(df):
+    columns = [column for column in pay_columns if column in df]
+    columns += [column for column in df.columns if column.endswith('_diff_pay') and column not in pay_columns]
+    return columns
+
+# Function to convert a chunk of hour-level rows (df_hours from calculate_total_earnings)
+# to compact dtypes
+def compact_hours(df_hours):
+    import pandas as pd
+
+    df = pd.DataFrame({
+        'start': df_hours['datetime'],
+        'end': df_hours['end'],
+        'week_start': df_hours['week_start'],
+        'shift_type': pd.Categorical.from_codes(df_hours['is_night'].astype('int8'), categories=shift_types),
+        'is_weekend': df_hours['is_weekend'],
+        'is_on_call': df_hours['is_on_call'],
+    })
+    for column in hour_columns:
+        df[column] = df_hours[column].astype('float32')
+    for column in money_columns(df_hours):
+        df[f'{column}_cents'] = (df_hours[column] * 100).round().astype('int32')
+    return df
+
+# Function to convert a chunk of weekly summary rows (weekly_data from calculate_total_earnings)
+# to compact dtypes
+def compact_weeks(df_weekly):
+    import pandas as pd
+
+    df = pd.DataFrame({'week_start': pd.to_datetime(df_weekly['week_start'])})
+    for column in hour_columns:
+        if column in df_weekly:
+            df[column] = df_weekly[column].astype('float32')
+    for column in money_columns(df_weekly):
+        df[f'{column}_cents'] = (df_weekly[column] * 100).round().astype('int32')
+    return df
+
+# Function to write a table to a binary file in the given format, converting it with compact
+# one chunk at a time
+def write_table(df, binary_file, file_format, compact, chunk_rows=EXPORT_CHUNK_ROWS):
+    chunks = (compact(df.iloc[start:start + chunk_rows]) for start in range(0, max(len(df), 1), chunk_rows))
+
+    if file_format == 'CSV':
+        text_file = io.TextIOWrapper(binary_file, encoding='utf-8', newline='')
+        for number, chunk in enumerate(chunks):
+            chunk.to_csv(text_file, header=number == 0, index=False)
+        text_file.flush()
+        text_file.detach()
+        return
+
+    import pyarrow as pa
+
+    first_chunk = next(chunks)
+    schema = pa.Schema.from_pandas(first_chunk, preserve_index=False)
+    if file_format == 'Parquet':
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(binary_file, schema)
+        write_chunk = lambda chunk: writer.write_table(pa.Table.from_pandas(chunk, schema, preserve_index=False))
+    elif file_format == 'Arrow IPC':
+        writer = pa.ipc.new_file(binary_file, schema)
+        write_chunk = lambda chunk: writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema, preserve_index=False))
+    else:
+        raise ValueError(f"Unknown export format {file_format!r}")
+
+    with writer:
+        write_chunk(first_chunk)
+        for chunk in chunks:
+            write_chunk(chunk)
+
+# Function to export hour-level rows
+def export_hours(df_hours, binary_file, file_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    write_table(df_hours, binary_file, file_format, compact_hours, chunk_rows)
+
+# Function to export the weekly summary
+def export_weeks(weekly_data, binary_file, file_format, chunk_rows=EXPORT_CHUNK_ROWS):
+    import pandas as pd
+
+    write_table(pd.DataFrame(weekly_data), binary_file, file_format, compact_weeks, chunk_rows)
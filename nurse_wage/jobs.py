@@ -0,0 +1,98 @@
+# Background earnings runs on a shared, bounded worker pool, with cancellation and partial
+# results. Threads are used rather than processes so runs can share the in-process week
+# cache, and the pandas/numpy work in each run releases the GIL for much of its time.
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from nurse_wage.pay import calculate_total_earnings
+
+# Worker threads shared by all sessions on a server
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Function to create the worker pool that earnings jobs are submitted to
+def make_worker_pool(max_workers=DEFAULT_WORKERS):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='earnings')
+
+# Function to count the workweeks a schedule (sorted by start time) spans, an upper bound on
+# the number of weeks with shifts. Weeks begin at workday_start_hour on week_start_day.
+def count_weeks(work_periods, week_start_day=0, workday_start_hour=0):
+    if not work_periods:
+        return 0
+    first_start = work_periods[0][0] - timedelta(hours=workday_start_hour)
+    last_end = work_periods[-1][1] - timedelta(hours=workday_start_hour, minutes=1)
+    first_week = first_start.date() - timedelta(days=(first_start.weekday() - week_start_day) % 7)
+    last_week = last_end.date() - timedelta(days=(last_end.weekday() - week_start_day) % 7)
+    return (last_week - first_week).days // 7 + 1
+
+# One calculate_total_earnings run submitted to an executor. key identifies the inputs, so the
+# page can tell when a run has gone stale. Weekly summaries are collected as they finish and
+# can be read with partial_weeks() while the rest of the run is still going.
+class EarningsJob:
+    def __init__(self, executor, key, work_periods, rates, overtime_rules, week_cache=None, rules=None):
+        self.key = key
+        self.total_weeks = count_weeks(work_periods, overtime_rules[0], overtime_rules[3])
+        self.seconds = None
+        self.cache_hits = self.cache_misses = None
+        self.shown = False
+        self._weeks = []
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._future = executor.submit(self._run, work_periods, rates, overtime_rules, week_cache, rules)
+
+    # Times the run and counts its week cache hits and misses (the cache is shared, so runs
+    # going at the same time count toward each other)
+    def _run(self, work_periods, rates, overtime_rules, week_cache, rules):
+        if week_cache is not None:
+            hits, misses = week_cache.hits, week_cache.misses
+        started = time.perf_counter()
+        try:
+            return calculate_total_earnings(work_periods, *rates, *overtime_rules, week_cache=week_cache,
+                                            on_week=self._add_week, cancel_event=self._cancel_event,
+                                            rules=rules)
+        finally:
+            self.seconds = time.perf_counter() - started
+            if week_cache is not None:
+                self.cache_hits = week_cache.hits - hits
+                self.cache_misses = week_cache.misses - misses
+
+    def _add_week(self, summary):
+        with self._lock:
+            self._weeks.append(summary)
+
+    # Stops the run before it starts, or between weeks once it is running
+    def cancel(self):
+        self._cancel_event.set()
+        self._future.cancel()
+
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def done(self):
+        return self._future.done()
+
+    # Waits up to timeout seconds for the run to finish; returns whether it has
+    def wait(self, timeout=None):
+        wait([self._future], timeout)
+        return self._future.done()
+
+    # Returns calculate_total_earnings' result, re-raising any error from the run
+    def result(self, timeout=None):
+        return self._future.result(timeout)
+
+    # Weekly summaries finished so far, in week order
+    def partial_weeks(self):
+        with self._lock:
+            weeks = list(self._weeks)
+        return sorted(weeks, key=lambda week: week['week_start'])
+
+    @property
+    def progress(self):
+        if self.done():
+            return 1.0
+        if not self.total_weeks:
+            return 0.0
+        with self._lock:
+            return min(len(self._weeks) / self.total_weeks, 1.0)
@@ -0,0 +1,44 @@
+# Regular and overtime hour split
+
+# Function to split each segment's hours into regular and overtime hours using running totals
+# per workday and per workweek. daily_overtime_rules is a sequence of (hours threshold,
+# multiplier), e.g. ((8, 1.5), (12, 2.0)); hours already paid as daily overtime don't count
+# toward weekly overtime.
+# Workdays (and workweeks) begin at workday_start_hour, so with 19 a 19:00-07:00 night shift is
+# one workday. Segments must not cross a workday boundary.
+def apply_overtime(df, week_start_day=0, weekly_overtime_hours=40, daily_overtime_rules=(),
+                   workday_start_hour=0, overtime_multiplier=1.5):
+    import pandas as pd
+
+    df = df.sort_values('datetime', kind='stable').reset_index(drop=True)
+    hours = df['hours']
+    workday_start = pd.Timedelta(hours=workday_start_hour)
+    shifted = df['datetime'] - workday_start
+    day = shifted.dt.normalize()
+    days_into_week = (shifted.dt.weekday - week_start_day) % 7
+    df['week_start'] = day - pd.to_timedelta(days_into_week, unit='D') + workday_start
+    df['week'] = df['week_start'].dt.strftime('%Y-%m-%d')
+
+    daily_overtime_hours = pd.Series(0.0, index=df.index)
+    overtime_paid_hours = pd.Series(0.0, index=df.index)
+    if daily_overtime_rules:
+        day_running_total = hours.groupby(day).cumsum()
+        rules = sorted(daily_overtime_rules)
+        # Hours of each segment past each threshold; the gap between consecutive thresholds is
+        # one tier
+        hours_past = [(day_running_total - threshold).clip(lower=0, upper=hours) for threshold, _ in rules]
+        hours_past.append(pd.Series(0.0, index=df.index))
+        for i, (_, multiplier) in enumerate(rules):
+            overtime_paid_hours += (hours_past[i] - hours_past[i + 1]) * multiplier
+        daily_overtime_hours = hours_past[0]
+
+    straight_hours = hours - daily_overtime_hours
+    week_running_total = straight_hours.groupby(df['week_start']).cumsum()
+    weekly_overtime = (week_running_total - weekly_overtime_hours).clip(lower=0, upper=straight_hours)
+
+    df['regular_hours'] = straight_hours - weekly_overtime
+    df['overtime_hours'] = daily_overtime_hours + weekly_overtime
+    df['overtime_paid_hours'] = overtime_paid_hours + weekly_overtime * overtime_multiplier
+    df['regular_earnings'] = df['total_hourly_rate'] * df['regular_hours']
+    df['overtime_earnings'] = df['total_hourly_rate'] * df['overtime_paid_hours']
+    return df
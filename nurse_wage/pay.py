@@ -0,0 +1,303 @@
+# Segment-based pay engine
+from collections import defaultdict
+from datetime import timedelta
+
+from nurse_wage.overtime import apply_overtime
+from nurse_wage.rules import DAY_SHIFT_START_HOUR, NIGHT_SHIFT_START_HOUR, default_rule_table
+from nurse_wage.schedule import FLAG_ON_CALL, WorkPeriodIndex, as_period_arrays
+
+# Function to label an hour of the day as day or night shift
+def determine_shift_differential(hour):
+    if NIGHT_SHIFT_START_HOUR <= hour or hour < DAY_SHIFT_START_HOUR:
+        return 'Night Shift'
+    else:
+        return 'Day Shift'
+
+# Function to check whether a date falls on the weekend
+def is_weekend(date):
+    return date.weekday() >= 5  # 5 = Saturday (5), 6 = Sunday (6)
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Function to cut periods given as minute counts at a sorted set of boundaries, all at once.
+# boundary_index(t) is the number of boundaries at or before minute t and boundary_minute(j)
+# the minute of boundary j. Returns the piece start and end minutes and, for each piece, the
+# position of its period.
+def cut_at_boundaries(start_minutes, end_minutes, boundary_index, boundary_minute):
+    import numpy as np
+
+    first_boundary = boundary_index(start_minutes)
+    pieces = boundary_index(end_minutes - 1) - first_boundary + 1
+    period = np.repeat(np.arange(len(start_minutes)), pieces)
+    piece = np.arange(len(period)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    boundary = first_boundary[period] + piece
+
+    piece_starts = np.where(piece == 0, start_minutes[period], boundary_minute(boundary - 1))
+    piece_ends = np.where(piece == pieces[period] - 1, end_minutes[period], boundary_minute(boundary))
+    return piece_starts, piece_ends, period
+
+# Function to cut period arrays (datetime64[m] starts and ends, uint8 flags) into segments
+# that each have a single pay rate, i.e. at every midnight and at the other minutes of the day
+# in day_boundaries (by default the default night window's DAY_SHIFT_START_HOUR and
+# NIGHT_SHIFT_START_HOUR; a rule table's own boundaries are in RuleTable.day_boundaries).
+# Returns the segment columns for price_segments.
+def split_period_arrays(starts, ends, flags, day_boundaries=None):
+    import numpy as np
+
+    if day_boundaries is None:
+        day_boundaries = (DAY_SHIFT_START_HOUR * 60, NIGHT_SHIFT_START_HOUR * 60)
+    offsets = np.array(sorted({0, *day_boundaries}))
+    per_day = len(offsets)
+
+    def boundary_index(minutes):
+        time_of_day = minutes % MINUTES_PER_DAY
+        return per_day * (minutes // MINUTES_PER_DAY) + np.searchsorted(offsets, time_of_day, side='right')
+
+    def boundary_minute(j):
+        return j // per_day * MINUTES_PER_DAY + offsets[j % per_day]
+
+    valid = starts < ends
+    segment_starts, segment_ends, period = cut_at_boundaries(
+        starts[valid].view('int64'), ends[valid].view('int64'), boundary_index, boundary_minute
+    )
+    return {
+        'datetime': segment_starts.astype('datetime64[m]').astype('datetime64[ns]'),
+        'end': segment_ends.astype('datetime64[m]').astype('datetime64[ns]'),
+        'is_on_call': (flags[valid][period] & FLAG_ON_CALL) != 0,
+    }
+
+# Function to cut work periods (tuples or a WorkPeriodIndex) into single-rate segments
+def split_work_periods(work_periods, rules=None):
+    day_boundaries = rules.day_boundaries if rules is not None else None
+    return split_period_arrays(*as_period_arrays(work_periods), day_boundaries)
+
+# Function to price each segment as a whole, at minute precision. Differentials come from the
+# rule table (a RuleTable) if given, otherwise from the built-in night, weekend and on-call
+# rules with the given amounts. Each rule name gets a <name>_diff_pay column.
+def price_segments(segments, hourly_rate, charge_nurse_pay, night_differential,
+                   weekend_differential, on_call_differential, differential_type, rules=None):
+    import pandas as pd
+
+    if rules is None:
+        rules = default_rule_table(night_differential, weekend_differential, on_call_differential)
+
+    df = pd.DataFrame(segments, columns=['datetime', 'end', 'is_on_call'])
+    minutes = (df['end'] - df['datetime']).dt.total_seconds() // 60
+    df['hours'] = minutes / 60
+    df = df[df['hours'] > 0].sort_values('datetime', kind='stable').reset_index(drop=True)
+
+    # One lookup table row per segment; the rules themselves are never evaluated per segment
+    combo = rules.combo_index(df['datetime'].values, df['is_on_call'].values)
+    segment_rates = rules.rate_table(hourly_rate, differential_type)[combo]
+
+    hour = df['datetime'].dt.hour
+    if rules.has_rule('night'):
+        df['is_night'] = rules.applies('night')[combo]
+    else:
+        df['is_night'] = (hour >= NIGHT_SHIFT_START_HOUR) | (hour < DAY_SHIFT_START_HOUR)
+    if rules.has_rule('weekend'):
+        df['is_weekend'] = rules.applies('weekend')[combo]
+    else:
+        df['is_weekend'] = df['datetime'].dt.weekday >= 5
+    df['base_pay'] = hourly_rate * df['hours']
+    df['charge_nurse_pay'] = charge_nurse_pay * df['hours']
+    total_hourly_rate = hourly_rate + charge_nurse_pay
+    for j, name in enumerate(rules.names):
+        df[f'{name}_diff_pay'] = segment_rates[:, j] * df['hours']
+        total_hourly_rate = total_hourly_rate + segment_rates[:, j]
+    df['total_hourly_rate'] = total_hourly_rate
+    df['pay'] = df['total_hourly_rate'] * df['hours']
+    return df
+
+# Function to list the differential pay columns of a segment or weekly frame
+def differential_columns(df):
+    return [column for column in df.columns if column.endswith('_diff_pay')]
+
+# Function to sum segment rows into one row per workweek
+def summarize_weeks(df_hours):
+    df_weekly = df_hours.groupby('week', sort=True).agg(
+        week_start=('week_start', 'first'),
+        regular_hours=('regular_hours', 'sum'),
+        overtime_hours=('overtime_hours', 'sum'),
+        base_pay=('base_pay', 'sum'),
+        charge_nurse_pay=('charge_nurse_pay', 'sum'),
+        **{column: (column, 'sum') for column in differential_columns(df_hours)},
+        regular_earnings=('regular_earnings', 'sum'),
+        overtime_earnings=('overtime_earnings', 'sum'),
+    ).reset_index()
+    df_weekly['total_weekly_pay'] = df_weekly['regular_earnings'] + df_weekly['overtime_earnings']
+    return df_weekly
+
+# Function to cut a WorkPeriodIndex at workweek boundaries and yield (week_start, arrays) for
+# each week, where arrays are that week's (starts, ends, flags). Weeks begin at
+# workday_start_hour on week_start_day.
+def iter_index_week_chunks(work_periods, week_start_day=0, workday_start_hour=0):
+    import numpy as np
+
+    # 1970-01-01 was a Thursday; weeks are counted from the first week_start_day after it
+    week_zero = ((week_start_day - 3) % 7) * MINUTES_PER_DAY + workday_start_hour * 60
+    starts, ends, flags = work_periods.starts, work_periods.ends, work_periods.flags
+    piece_starts, piece_ends, period = cut_at_boundaries(
+        starts.view('int64'), ends.view('int64'),
+        lambda minutes: (minutes - week_zero) // MINUTES_PER_WEEK + 1,
+        lambda j: j * MINUTES_PER_WEEK + week_zero,
+    )
+    weeks = (piece_starts - week_zero) // MINUTES_PER_WEEK
+    piece_starts = piece_starts.astype('datetime64[m]')
+    piece_ends = piece_ends.astype('datetime64[m]')
+    piece_flags = flags[period]
+
+    # Periods never overlap, so the pieces are in time order and each week is one block
+    week_numbers, block_starts = np.unique(weeks, return_index=True)
+    block_ends = list(block_starts[1:]) + [len(weeks)]
+    for week, block_start, block_end in zip(week_numbers.tolist(), block_starts.tolist(), block_ends):
+        week_start = np.datetime64(week * MINUTES_PER_WEEK + week_zero, 'm').item()
+        yield week_start, (piece_starts[block_start:block_end], piece_ends[block_start:block_end],
+                           piece_flags[block_start:block_end])
+
+# Function to cut work periods (sorted by start time) at workweek boundaries and yield
+# (week_start, arrays) one week at a time, where arrays are that week's (starts, ends, flags).
+# A WorkPeriodIndex is cut in one vectorized pass; other iterables are consumed lazily, so
+# generated schedules are processed in weekly chunks instead of being materialized up front.
+def iter_week_chunks(work_periods, week_start_day=0, workday_start_hour=0):
+    if isinstance(work_periods, WorkPeriodIndex):
+        yield from iter_index_week_chunks(work_periods, week_start_day, workday_start_hour)
+        return
+
+    workday_start = timedelta(hours=workday_start_hour)
+    pending = defaultdict(list)
+    for start_time, end_time, is_on_call in work_periods:
+        day = (start_time - workday_start).replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start = day - timedelta(days=(day.weekday() - week_start_day) % 7) + workday_start
+
+        # Earlier weeks can't receive any more pieces once a later period starts
+        for finished_week in sorted(week for week in pending if week < week_start):
+            yield finished_week, as_period_arrays(sorted(pending.pop(finished_week)))
+
+        current_time = start_time
+        while current_time < end_time:
+            week_end = week_start + timedelta(days=7)
+            piece_end = min(end_time, week_end)
+            pending[week_start].append((current_time, piece_end, is_on_call))
+            current_time = piece_end
+            week_start = week_end
+
+    for finished_week in sorted(pending):
+        yield finished_week, as_period_arrays(sorted(pending[finished_week]))
+
+# Function to calculate the segments and weekly totals of several workweeks in one vectorized
+# pass. weeks_periods holds each week's (starts, ends, flags) arrays, rates ends with the
+# rule table and overtime_rules ends with the workday start hour. Returns the combined
+# segment frame and a dict of week start -> weekly summary; weeks without paid time are left
+# out. With split_frames, the summary is paired with that week's own rows, for caching.
+def calculate_weeks(weeks_periods, rates, overtime_rules, split_frames=False):
+    import numpy as np
+
+    rules = rates[-1]
+    starts, ends, flags = (np.concatenate(arrays) for arrays in zip(*weeks_periods))
+    # Segments are also cut where workdays begin, so each falls in one workday
+    segments = split_period_arrays(starts, ends, flags, (*rules.day_boundaries, overtime_rules[-1] * 60))
+    df_hours = price_segments(segments, *rates)
+    if df_hours.empty:
+        return df_hours, {}
+    df_hours = apply_overtime(df_hours, *overtime_rules)
+    df_weekly = summarize_weeks(df_hours)
+    summaries = df_weekly.to_dict('records')
+    if not split_frames:
+        return df_hours, {summary['week_start']: summary for summary in summaries}
+
+    # Rows are sorted by time, so each week's rows form one contiguous block
+    starts = df_hours['week_start'].searchsorted(df_weekly['week_start'])
+    ends = list(starts[1:]) + [len(df_hours)]
+    return df_hours, {
+        summary['week_start']: (summary, df_hours.iloc[start:end])
+        for summary, start, end in zip(summaries, starts, ends)
+    }
+
+# Function to calculate total earnings with detailed breakdown. work_periods can be a
+# WorkPeriodIndex or any iterable sorted by start time, including a generator. Weeks are
+# looked up in week_cache first; the rest are calculated together, chunk_weeks weeks per
+# vectorized pass, so only the weeks whose shifts or rates changed are redone.
+# on_week, if given, is called with each weekly summary as soon as it is known (not
+# necessarily in week order). Setting cancel_event (a threading.Event) stops the run
+# between weeks with concurrent.futures.CancelledError. rules, a RuleTable, replaces the
+# built-in night, weekend and on-call differentials. Workdays, for daily overtime, and
+# workweeks begin at workday_start_hour.
+def calculate_total_earnings(work_periods, hourly_rate, charge_nurse_pay, night_differential,
+                             weekend_differential, on_call_differential, differential_type,
+                             week_start_day=0, weekly_overtime_hours=40, daily_overtime_rules=(),
+                             workday_start_hour=0, week_cache=None, chunk_weeks=256, on_week=None,
+                             cancel_event=None, rules=None):
+    from concurrent.futures import CancelledError
+
+    import pandas as pd
+
+    if rules is None:
+        rules = default_rule_table(night_differential, weekend_differential, on_call_differential)
+    rates = (hourly_rate, charge_nurse_pay, night_differential, weekend_differential,
+             on_call_differential, differential_type, rules)
+    overtime_rules = (week_start_day, weekly_overtime_hours, tuple(daily_overtime_rules), workday_start_hour)
+    not_cached = object()
+
+    week_summaries = {}
+    frames = []
+    missed_weeks = []
+
+    def calculate_missed_weeks():
+        df_batch, results = calculate_weeks([periods for _, _, periods in missed_weeks], rates,
+                                            overtime_rules, split_frames=week_cache is not None)
+        frames.append(df_batch)
+        for week_start, key, _ in missed_weeks:
+            result = results.get(pd.Timestamp(week_start))
+            if week_cache is not None:
+                week_cache.put(key, result)
+                result = result[0] if result is not None else None
+            week_summaries[week_start] = result
+            if on_week is not None and result is not None:
+                on_week(result)
+        missed_weeks.clear()
+
+    for week_start, week_periods in iter_week_chunks(work_periods, week_start_day, workday_start_hour):
+        if cancel_event is not None and cancel_event.is_set():
+            raise CancelledError()
+        key = (week_start, tuple(array.tobytes() for array in week_periods), rates, overtime_rules)
+        result = week_cache.get(key, not_cached) if week_cache is not None else not_cached
+        if result is not_cached:
+            week_summaries[week_start] = None
+            missed_weeks.append((week_start, key, week_periods))
+            if len(missed_weeks) >= chunk_weeks:
+                calculate_missed_weeks()
+        elif result is not None:
+            week_summaries[week_start] = result[0]
+            frames.append(result[1])
+            if on_week is not None:
+                on_week(result[0])
+    if missed_weeks:
+        calculate_missed_weeks()
+
+    weekly_data = [dict(summary) for summary in week_summaries.values() if summary is not None]
+    frames = [frame for frame in frames if not frame.empty]
+    if frames:
+        df_hours = pd.concat(frames, ignore_index=True).sort_values('datetime', kind='stable', ignore_index=True)
+    else:
+        df_hours = pd.DataFrame()
+    total_hours = sum(week['regular_hours'] + week['overtime_hours'] for week in weekly_data)
+    total_earnings = sum(week['total_weekly_pay'] for week in weekly_data)
+
+    return total_earnings, total_hours, weekly_data, df_hours
+
+# Function to digest each workweek of a schedule together with the inputs it is priced with
+# (the rates, overtime rules and any rule table), so a saved weekly summary can be told apart
+# from one whose shifts or rates have since changed. Returns {week start: hex digest}.
+def week_digests(work_periods, rates, overtime_rules, rules=None):
+    import hashlib
+
+    params = repr((tuple(rates), tuple(overtime_rules), rules)).encode()
+    digests = {}
+    for week_start, week_periods in iter_week_chunks(work_periods, overtime_rules[0], overtime_rules[3]):
+        digest = hashlib.blake2b(params, digest_size=16)
+        for array in week_periods:
+            digest.update(array.tobytes())
+        digests[week_start] = digest.hexdigest()
+    return digests
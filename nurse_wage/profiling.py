@@ -0,0 +1,50 @@
+# Lightweight per-stage timing for the earnings pipeline
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# Collects wall time, row counts and cache hits/misses for named stages. When disabled,
+# stage() hands back a do-nothing context manager, so instrumented code costs next to nothing.
+class StageTimer:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = []
+
+    # Use as `with timer.stage('name', cache) as record: ... record['rows'] = n`. When a cache
+    # (anything with hits and misses counters) is given, the hits and misses during the stage
+    # are recorded too.
+    def stage(self, name, cache=None):
+        if not self.enabled:
+            return nullcontext({})
+        return self._timed_stage(name, cache)
+
+    @contextmanager
+    def _timed_stage(self, name, cache):
+        record = {'stage': name, 'rows': None}
+        if cache is not None:
+            hits, misses = cache.hits, cache.misses
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - started
+            if cache is not None:
+                record['cache_hits'] = cache.hits - hits
+                record['cache_misses'] = cache.misses - misses
+            self.stages.append(record)
+
+    # Records a stage that was timed elsewhere, e.g. in a background thread, with the cache
+    # hits and misses counted there if any
+    def add_stage(self, name, seconds, rows=None, cache_hits=None, cache_misses=None):
+        if self.enabled:
+            record = {'stage': name, 'rows': rows, 'seconds': seconds}
+            if cache_hits is not None:
+                record['cache_hits'] = cache_hits
+                record['cache_misses'] = cache_misses
+            self.stages.append(record)
+
+    def total_seconds(self):
+        return sum(record['seconds'] for record in self.stages)
+
+    def to_json(self):
+        return json.dumps({'total_seconds': self.total_seconds(), 'stages': self.stages}, indent=2)
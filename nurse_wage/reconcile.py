@@ -0,0 +1,167 @@
+# Paystub reconciliation: actual pay records (date, earnings code, amount and optionally hours
+# and person) are summed per workweek and pay category and merged against the expected
+# breakdown from calculate_total_earnings in one vectorized join, flagging differences above
+# a tolerance.
+
+# Expected pay categories besides the differential columns (<name>_diff_pay):
+#   regular: base rate for regular hours
+#   overtime: base rate for overtime hours, with the overtime multiplier
+#   overtime_differentials: the overtime multiplier's share of charge and differential pay
+#   total: all pay for the week
+base_categories = ['regular', 'overtime', 'charge_nurse_pay']
+
+# Common paystub earnings codes and the category they are paid under. Codes are matched
+# ignoring case; a code that is a category name, or a differential name such as "holiday",
+# is matched to that category. Other codes are kept as their own category, so they show up
+# as unexpected pay.
+pay_codes = {
+    'REG': 'regular', 'REGULAR': 'regular', 'BASE': 'regular',
+    'OT': 'overtime', 'OVERTIME': 'overtime', 'DT': 'overtime', 'DOUBLE TIME': 'overtime',
+    'OTD': 'overtime_differentials', 'OT DIFF': 'overtime_differentials',
+    'CHG': 'charge_nurse_pay', 'CHARGE': 'charge_nurse_pay',
+    'NIGHT': 'night_diff_pay', 'NGT': 'night_diff_pay', 'SHIFT DIFF': 'night_diff_pay',
+    'WKND': 'weekend_diff_pay', 'WEEKEND': 'weekend_diff_pay',
+    'ONCALL': 'on_call_diff_pay', 'ON CALL': 'on_call_diff_pay', 'CALL': 'on_call_diff_pay',
+    'HOL': 'holiday_diff_pay', 'HOLIDAY': 'holiday_diff_pay',
+}
+
+# Columns a pay record file must have; hours and person are optional
+required_record_columns = ['date', 'code', 'amount']
+
+# Function to read pay records from a CSV, Parquet or Arrow IPC file (a path, or a binary file
+# with its name given), with column names matched ignoring case
+def read_pay_records(source, name=None):
+    import pandas as pd
+
+    from nurse_wage.export import export_format_for_path
+
+    name = str(name or source)
+    try:
+        file_format = export_format_for_path(name)
+    except ValueError:
+        raise ValueError(f"Pay records must be a .csv, .parquet or .arrow file, not {name!r}")
+    if file_format == 'Parquet':
+        df_records = pd.read_parquet(source)
+    elif file_format == 'Arrow IPC':
+        import pyarrow as pa
+
+        if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+            source = pa.memory_map(str(source))
+        df_records = pa.ipc.open_file(source).read_pandas()
+    else:
+        df_records = pd.read_csv(source)
+
+    df_records.columns = [str(column).strip().lower() for column in df_records.columns]
+    missing = [column for column in required_record_columns if column not in df_records]
+    if missing:
+        raise ValueError(f"Pay records are missing the column(s) {', '.join(missing)}")
+    return df_records
+
+# Function to build the expected pay of each workweek and category from hour-level rows
+# (df_hours from calculate_total_earnings), in long form: week, category, expected_amount,
+# expected_hours (hours only for regular, overtime and total)
+def expected_pay_breakdown(df_hours):
+    import pandas as pd
+
+    from nurse_wage.pay import differential_columns
+
+    base_rate = (df_hours['base_pay'] / df_hours['hours']).fillna(0)
+    premium_rate = df_hours['total_hourly_rate'] - base_rate
+    differentials = differential_columns(df_hours)
+    df = pd.DataFrame({
+        'week': df_hours['week'],
+        'regular': base_rate * df_hours['regular_hours'],
+        'overtime': base_rate * df_hours['overtime_paid_hours'],
+        'overtime_differentials': premium_rate * (df_hours['overtime_paid_hours'] - df_hours['overtime_hours']),
+        'charge_nurse_pay': df_hours['charge_nurse_pay'],
+        **{column: df_hours[column] for column in differentials},
+        'total': df_hours['regular_earnings'] + df_hours['overtime_earnings'],
+        'regular_hours': df_hours['regular_hours'],
+        'overtime_hours': df_hours['overtime_hours'],
+    })
+    df_weeks = df.groupby('week', sort=True).sum()
+
+    categories = base_categories + differentials + ['overtime_differentials', 'total']
+    df_expected = df_weeks[categories].rename_axis(columns='category').stack().rename('expected_amount').reset_index()
+    hours = {
+        'regular': df_weeks['regular_hours'],
+        'overtime': df_weeks['overtime_hours'],
+        'total': df_weeks['regular_hours'] + df_weeks['overtime_hours'],
+    }
+    df_hours_long = pd.concat(hours, names=['category']).rename('expected_hours').reset_index()
+    return df_expected.merge(df_hours_long, on=['category', 'week'], how='left')
+
+# Function to sum pay records into actual pay per workweek and category, in long form: week,
+# category, actual_amount, actual_hours (plus person, when the records have it). Workweeks
+# begin at workday_start_hour on week_start_day, like apply_overtime's; a record's date may
+# have a time, and a date alone is midnight.
+def actual_pay_breakdown(df_records, week_start_day=0, workday_start_hour=0, codes=None, categories=()):
+    import numpy as np
+    import pandas as pd
+
+    codes = {code.upper(): category for code, category in (pay_codes if codes is None else codes).items()}
+    categories = set(categories)
+
+    # Map each distinct code once, then broadcast back to the records
+    code_names = df_records['code'].astype(str).str.strip()
+    code_index, unique_codes = pd.factorize(code_names)
+    mapped = []
+    for code in unique_codes.tolist():
+        category = codes.get(code.upper(), code.lower().replace(' ', '_'))
+        if category not in categories and f'{category}_diff_pay' in categories:
+            category = f'{category}_diff_pay'
+        mapped.append(category)
+
+    day = (pd.to_datetime(df_records['date'], format='mixed') - pd.Timedelta(hours=workday_start_hour)).dt.normalize()
+    week_start = day - pd.to_timedelta((day.dt.weekday - week_start_day) % 7, unit='D')
+    hours = df_records['hours'] if 'hours' in df_records else pd.Series(np.nan, index=df_records.index)
+    # Weeks are labelled like the week column of calculate_total_earnings, formatting each
+    # distinct week once
+    week_codes, week_starts = pd.factorize(week_start)
+    df = pd.DataFrame({
+        'week': week_starts.strftime('%Y-%m-%d').to_numpy(dtype=object)[week_codes],
+        'category': np.array(mapped, dtype=object)[code_index],
+        'actual_amount': pd.to_numeric(df_records['amount']),
+        'actual_hours': pd.to_numeric(hours),
+    })
+    keys = ['week', 'category']
+    if 'person' in df_records:
+        df.insert(0, 'person', df_records['person'].astype(str).to_numpy())
+        keys.insert(0, 'person')
+
+    df_actual = df.groupby(keys, sort=True).sum(min_count=1).reset_index()
+    # Hours worked are the hours paid as regular or overtime time
+    df_total = df.assign(actual_hours=df['actual_hours'].where(df['category'].isin(['regular', 'overtime'])))
+    df_total = df_total.groupby(keys[:-1], sort=True)[['actual_amount', 'actual_hours']].sum(min_count=1)
+    df_total = df_total.reset_index().assign(category='total')
+    return pd.concat([df_actual, df_total], ignore_index=True)
+
+# Function to merge expected and actual pay on week and category (and person, when both have
+# it) and flag each difference larger than tolerance dollars or hours_tolerance hours. Weeks
+# or categories found on only one side count as zero on the other.
+def reconcile_pay(df_expected, df_actual, tolerance=0.01, hours_tolerance=0.01):
+    keys = ['week', 'category']
+    if 'person' in df_expected and 'person' in df_actual:
+        keys.insert(0, 'person')
+
+    df = df_expected.merge(df_actual, on=keys, how='outer', sort=True)
+    df['expected_amount'] = df['expected_amount'].fillna(0.0)
+    df['actual_amount'] = df['actual_amount'].fillna(0.0)
+    # Adding 0.0 turns a rounded -0.0 into 0.0
+    df['difference'] = (df['actual_amount'] - df['expected_amount']).round(2) + 0.0
+    df['hours_difference'] = (df['actual_hours'] - df['expected_hours']).round(2) + 0.0
+    df['flagged'] = (df['difference'].abs() > tolerance) | (df['hours_difference'].abs() > hours_tolerance)
+
+    # Categories that are zero on both sides (e.g. a differential with no hours) aren't listed
+    df = df[(df['expected_amount'] != 0) | (df['actual_amount'] != 0) | df['flagged']]
+    columns = keys + ['expected_amount', 'actual_amount', 'difference', 'expected_hours', 'actual_hours',
+                      'hours_difference', 'flagged']
+    return df[columns].reset_index(drop=True)
+
+# Function to reconcile pay records against hour-level rows in one step; see reconcile_pay
+def reconcile_pay_records(df_records, df_hours, week_start_day=0, workday_start_hour=0, tolerance=0.01,
+                          hours_tolerance=0.01, codes=None):
+    df_expected = expected_pay_breakdown(df_hours)
+    df_actual = actual_pay_breakdown(df_records, week_start_day, workday_start_hour, codes,
+                                     df_expected['category'].unique())
+    return reconcile_pay(df_expected, df_actual, tolerance, hours_tolerance)
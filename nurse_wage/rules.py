@@ -0,0 +1,220 @@
+# Declarative differential rules. A rule table is compiled once into a lookup table over every
+# combination of time-of-day region, weekday, holiday and on-call status, so pricing a segment
+# is a single table lookup however many rules there are.
+import functools
+from collections import namedtuple
+from datetime import date, timedelta
+
+# Hours of the day at which the default night differential starts and ends
+DAY_SHIFT_START_HOUR = 7
+NIGHT_SHIFT_START_HOUR = 19
+
+MINUTES_PER_DAY = 24 * 60
+
+weekday_names = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# Pay columns that always exist, even when no rule of that name is in the table
+standard_rule_names = ['night', 'weekend', 'on_call']
+
+# One differential. amount is a percentage of the hourly rate or dollars per hour, following
+# the differential type. The rule applies to time that meets every condition given:
+#   start_hour, end_hour: daily window [start_hour, end_hour), wrapping past midnight when
+#       end_hour <= start_hour; a missing start is midnight and a missing end is the next midnight
+#   weekdays: weekday numbers (0 = Monday) of the day the time falls on; None for every day
+#   holidays: True for holiday dates only, False for all other dates, None for both
+#   on_call: True for on-call time only, None for all time
+# Matching rules stack, except rules with the same group: of those, only the one with the
+# highest priority is paid (the first in the table on a tie). Rules with the same name are
+# paid into the same column.
+DifferentialRule = namedtuple(
+    'DifferentialRule',
+    ['name', 'amount', 'start_hour', 'end_hour', 'weekdays', 'holidays', 'on_call', 'group', 'priority'],
+    defaults=[None, None, None, None, None, None, 0],
+)
+
+# Function to parse weekdays written as names or numbers, e.g. "Fri, Sat" or [4, 5]
+def parse_weekdays(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = [part.strip() for part in value.split(',') if part.strip()]
+    weekdays = []
+    for day in value:
+        if isinstance(day, str) and day[:3].title() in weekday_names:
+            weekdays.append(weekday_names.index(day[:3].title()))
+        elif str(day).isdigit() and int(day) < 7:
+            weekdays.append(int(day))
+        else:
+            raise ValueError(f"Unknown weekday {day!r}")
+    return tuple(sorted(set(weekdays)))
+
+# Function to check whether a rule applies to a time-of-day region starting at minute
+def rule_matches(rule, minute, weekday, is_holiday, is_on_call):
+    start = 0 if rule.start_hour is None else round(rule.start_hour * 60)
+    end = MINUTES_PER_DAY if rule.end_hour is None else round(rule.end_hour * 60)
+    if start < end:
+        in_window = start <= minute < end
+    elif start > end:
+        in_window = minute >= start or minute < end
+    else:
+        in_window = True
+    return (in_window
+            and (rule.weekdays is None or weekday in rule.weekdays)
+            and (rule.holidays is None or rule.holidays == is_holiday)
+            and (not rule.on_call or is_on_call))
+
+# Compiled rule table. Rule windows split the day into regions; for each combination of
+# region, weekday, holiday and on-call status the rules that apply are worked out once, with
+# stacking groups resolved. Holiday dates are kept as a bitmap over the days they span, so a
+# holiday lookup is one array index.
+class RuleTable:
+    def __init__(self, rules, holiday_dates=()):
+        import numpy as np
+
+        self.rules = tuple(DifferentialRule(*rule) for rule in rules)
+        self.rules = tuple(rule._replace(weekdays=parse_weekdays(rule.weekdays)) for rule in self.rules)
+        self.holiday_dates = tuple(sorted(set(holiday_dates)))
+        self.names = list(standard_rule_names)
+        self.names += sorted({rule.name for rule in self.rules} - set(standard_rule_names))
+
+        boundaries = {0}
+        for rule in self.rules:
+            for hour in (rule.start_hour, rule.end_hour):
+                if hour is not None:
+                    boundaries.add(round(hour * 60) % MINUTES_PER_DAY)
+        self.day_boundaries = tuple(sorted(boundaries))
+
+        combos = len(self.day_boundaries) * 7 * 2 * 2
+        applies = np.zeros((combos, len(self.rules)), dtype=bool)
+        combo = 0
+        for minute in self.day_boundaries:
+            for weekday in range(7):
+                for is_holiday in (False, True):
+                    for is_on_call in (False, True):
+                        best_in_group = {}
+                        for i, rule in enumerate(self.rules):
+                            if not rule_matches(rule, minute, weekday, is_holiday, is_on_call):
+                                continue
+                            if rule.group is None:
+                                applies[combo, i] = True
+                            elif (rule.group not in best_in_group
+                                  or rule.priority > self.rules[best_in_group[rule.group]].priority):
+                                best_in_group[rule.group] = i
+                        applies[combo, list(best_in_group.values())] = True
+                        combo += 1
+        self._applies = applies
+
+        # Rule -> pay column
+        self._name_matrix = np.zeros((len(self.rules), len(self.names)))
+        for i, rule in enumerate(self.rules):
+            self._name_matrix[i, self.names.index(rule.name)] = 1.0
+
+        if self.holiday_dates:
+            day_numbers = np.array(self.holiday_dates, dtype='datetime64[D]').view('int64')
+            self._holiday_offset = int(day_numbers[0])
+            self._holiday_bitmap = np.zeros(int(day_numbers[-1]) - self._holiday_offset + 1, dtype=bool)
+            self._holiday_bitmap[day_numbers - self._holiday_offset] = True
+        else:
+            self._holiday_offset = 0
+            self._holiday_bitmap = np.zeros(0, dtype=bool)
+
+    def __eq__(self, other):
+        return (isinstance(other, RuleTable)
+                and (self.rules, self.holiday_dates) == (other.rules, other.holiday_dates))
+
+    def __hash__(self):
+        return hash((self.rules, self.holiday_dates))
+
+    def __repr__(self):
+        return f"RuleTable({list(self.rules)!r}, holiday_dates={list(self.holiday_dates)!r})"
+
+    # Function to look up whether days (as days since 1970-01-01) are holidays
+    def is_holiday(self, day_numbers):
+        import numpy as np
+
+        index = day_numbers - self._holiday_offset
+        inside = (index >= 0) & (index < len(self._holiday_bitmap))
+        is_holiday = np.zeros(len(index), dtype=bool)
+        is_holiday[inside] = self._holiday_bitmap[index[inside]]
+        return is_holiday
+
+    # Function to find the lookup table row of each segment from its start time and on-call
+    # flag. Segments must not cross a day boundary (see split_period_arrays).
+    def combo_index(self, starts, is_on_call):
+        import numpy as np
+
+        minutes = starts.astype('datetime64[m]').view('int64')
+        day_numbers = minutes // MINUTES_PER_DAY
+        region = np.searchsorted(self.day_boundaries, minutes % MINUTES_PER_DAY, side='right') - 1
+        weekday = (day_numbers + 3) % 7  # 1970-01-01 was a Thursday
+        is_holiday = self.is_holiday(day_numbers)
+        return ((region * 7 + weekday) * 2 + is_holiday) * 2 + is_on_call.astype(np.int64)
+
+    # Function to build the hourly differential of each pay column for every lookup table row
+    def rate_table(self, hourly_rate, differential_type):
+        import numpy as np
+
+        amounts = np.array([rule.amount for rule in self.rules], dtype=float)
+        if differential_type == "Percentage":
+            amounts = hourly_rate * (amounts / 100)
+        return (self._applies * amounts) @ self._name_matrix
+
+    # Function to tell, for every lookup table row, whether any rule with this name applies
+    def applies(self, name):
+        return (self._applies @ self._name_matrix[:, self.names.index(name)]) > 0
+
+    def has_rule(self, name):
+        return any(rule.name == name for rule in self.rules)
+
+# Function to build the rule table of the built-in night, weekend and on-call differentials
+@functools.lru_cache(maxsize=64)
+def default_rule_table(night_differential, weekend_differential, on_call_differential):
+    return RuleTable([
+        DifferentialRule('night', night_differential, NIGHT_SHIFT_START_HOUR, DAY_SHIFT_START_HOUR),
+        DifferentialRule('weekend', weekend_differential, weekdays=(5, 6)),
+        DifferentialRule('on_call', on_call_differential, on_call=True),
+    ])
+
+# Function to find the nth given weekday of a month; n = -1 is the last one
+def nth_weekday(year, month, weekday, n):
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1))
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+# Function to list the US federal holidays (on their actual dates) of the given years
+def federal_holidays(years):
+    holidays = []
+    for year in years:
+        holidays += [
+            date(year, 1, 1),  # New Year's Day
+            nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+            nth_weekday(year, 2, 0, 3),  # Presidents' Day
+            nth_weekday(year, 5, 0, -1),  # Memorial Day
+            date(year, 6, 19),  # Juneteenth
+            date(year, 7, 4),  # Independence Day
+            nth_weekday(year, 9, 0, 1),  # Labor Day
+            nth_weekday(year, 10, 0, 2),  # Columbus Day
+            date(year, 11, 11),  # Veterans Day
+            nth_weekday(year, 11, 3, 4),  # Thanksgiving
+            date(year, 12, 25),  # Christmas Day
+        ]
+    return holidays
+
+# Function to build a rule table from a config dict such as
+#   {"rules": [{"name": "night", "amount": 16, "start_hour": 23, "end_hour": 7},
+#              {"name": "holiday", "amount": 50, "holidays": true}],
+#    "holidays": ["2024-12-24"], "federal_holidays": true}
+# Federal holidays are added for the given years.
+def rule_table_from_config(config, years=()):
+    rules = []
+    for rule in config.get('rules', []):
+        rule = dict(rule)
+        rule['weekdays'] = parse_weekdays(rule.get('weekdays'))
+        rules.append(DifferentialRule(**rule))
+    holiday_dates = [date.fromisoformat(day) if isinstance(day, str) else day
+                     for day in config.get('holidays', [])]
+    if config.get('federal_holidays'):
+        holiday_dates += federal_holidays(years)
+    return RuleTable(rules, holiday_dates)
@@ -0,0 +1,244 @@
+# Work period containers and generators
+from datetime import timedelta
+
+# Bits of the packed flags array
+FLAG_ON_CALL = 1
+
+# Function to convert a datetime to datetime64[m]. Times are kept as wall-clock times, so a
+# time zone is dropped rather than converted.
+def to_minute(value):
+    import numpy as np
+
+    if getattr(value, 'tzinfo', None) is not None:
+        value = value.replace(tzinfo=None)
+    return np.datetime64(value, 'm')
+
+# Function to convert a list of datetimes to a datetime64[m] array (pandas parses datetime
+# objects several times faster than numpy)
+def to_minute_array(values):
+    import pandas as pd
+
+    try:
+        index = pd.DatetimeIndex(values)
+    except (TypeError, ValueError):
+        # Mixed time zones, or time zone aware and naive times together
+        index = pd.DatetimeIndex([value.replace(tzinfo=None) for value in values])
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values.astype('datetime64[m]')
+
+# Function to convert (start, end, is_on_call) tuples to start/end datetime64[m] arrays and a
+# flags array; a WorkPeriodIndex hands over its own arrays without copying
+def as_period_arrays(work_periods):
+    import numpy as np
+
+    if isinstance(work_periods, WorkPeriodIndex):
+        return work_periods.starts, work_periods.ends, work_periods.flags
+    work_periods = list(work_periods)
+    starts = to_minute_array([p[0] for p in work_periods])
+    ends = to_minute_array([p[1] for p in work_periods])
+    flags = np.array([FLAG_ON_CALL if p[2] else 0 for p in work_periods], dtype=np.uint8)
+    return starts, ends, flags
+
+# Sorted collection of non-overlapping work periods, kept to the minute as a struct of
+# arrays: datetime64[m] starts and ends plus a uint8 bit field of flags, about 17 bytes per
+# period instead of ~160 for a list of (datetime, datetime, bool) tuples. Iterating still
+# yields tuples. Because periods never overlap, their end times are sorted too, so an overlap
+# query only needs to look at the period just before the insertion point.
+class WorkPeriodIndex:
+    def __init__(self, work_periods=()):
+        import numpy as np
+
+        self._starts = np.empty(0, dtype='datetime64[m]')
+        self._ends = np.empty(0, dtype='datetime64[m]')
+        self._flags = np.empty(0, dtype=np.uint8)
+        self.bulk_insert(work_periods)
+
+    # Builds an index from start/end datetime64[m] arrays and a flags array
+    @classmethod
+    def from_arrays(cls, starts, ends, flags):
+        index = cls()
+        index.insert_arrays(starts, ends, flags)
+        return index
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return zip(self._starts.tolist(), self._ends.tolist(), (self._flags & FLAG_ON_CALL).astype(bool).tolist())
+
+    def __getitem__(self, i):
+        return self._starts[i].item(), self._ends[i].item(), bool(self._flags[i] & FLAG_ON_CALL)
+
+    # Read-only views of the arrays, for code that works on the whole schedule at once
+    @property
+    def starts(self):
+        return self._read_only(self._starts)
+
+    @property
+    def ends(self):
+        return self._read_only(self._ends)
+
+    @property
+    def flags(self):
+        return self._read_only(self._flags)
+
+    # Digest of the whole schedule, for cache keys and change detection
+    def fingerprint(self):
+        import hashlib
+
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (self._starts, self._ends, self._flags):
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    @property
+    def nbytes(self):
+        return self._starts.nbytes + self._ends.nbytes + self._flags.nbytes
+
+    @staticmethod
+    def _read_only(array):
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    def overlaps(self, new_start, new_end):
+        import numpy as np
+
+        i = int(np.searchsorted(self._starts, to_minute(new_end), side='left'))
+        return i > 0 and self._ends[i - 1] > to_minute(new_start)
+
+    def insert(self, work_period):
+        import numpy as np
+
+        start, end, is_on_call = work_period
+        start = to_minute(start)
+        end = to_minute(end)
+        if end <= start or self.overlaps(start, end):
+            return False
+        i = int(np.searchsorted(self._starts, start, side='right'))
+        self._starts = np.insert(self._starts, i, start)
+        self._ends = np.insert(self._ends, i, end)
+        self._flags = np.insert(self._flags, i, FLAG_ON_CALL if is_on_call else 0)
+        return True
+
+    # Sorts the new periods once and checks each against its stored neighbours (found with
+    # searchsorted) and the last new period kept, skipping any that overlap. Returns the
+    # periods that were added, in start order.
+    def bulk_insert(self, work_periods):
+        starts, ends, flags = as_period_arrays(work_periods)
+        kept = self.insert_arrays(starts, ends, flags)
+        return sorted(zip(starts[kept].tolist(), ends[kept].tolist(),
+                          (flags[kept] & FLAG_ON_CALL).astype(bool).tolist()))
+
+    # Same as bulk_insert, for periods given as start/end datetime64[m] arrays and a flags
+    # array. Returns a boolean mask, in input order, of the periods that were added.
+    def insert_arrays(self, starts, ends, flags):
+        import numpy as np
+
+        kept = np.zeros(len(starts), dtype=bool)
+        valid = np.flatnonzero(starts < ends)
+        order = valid[np.argsort(starts[valid], kind='stable')]
+        starts, ends, flags = starts[order], ends[order], flags[order]
+
+        # Stored neighbours: the last period starting at or before each new start, and the next one
+        after = np.searchsorted(self._starts, starts, side='right')
+        before_end = self._ends[np.maximum(after - 1, 0)] if len(self) else ends
+        next_start = self._starts[np.minimum(after, len(self) - 1)] if len(self) else ends
+        free = ((after == 0) | (before_end <= starts)) & ((after == len(self)) | (next_start >= ends))
+
+        # New periods that overlap an earlier kept new period are dropped in start order
+        keep = np.zeros(len(starts), dtype=bool)
+        candidates = np.flatnonzero(free)
+        last_end = float('-inf')
+        for i, start, end in zip(candidates.tolist(), starts[candidates].view('int64').tolist(),
+                                 ends[candidates].view('int64').tolist()):
+            if last_end <= start:
+                keep[i] = True
+                last_end = end
+
+        kept[order[keep]] = True
+        starts, ends, flags = starts[keep], ends[keep], flags[keep]
+        if len(starts):
+            all_starts = np.concatenate([self._starts, starts])
+            order = np.argsort(all_starts, kind='stable')
+            self._starts = all_starts[order]
+            self._ends = np.concatenate([self._ends, ends])[order]
+            self._flags = np.concatenate([self._flags, flags])[order]
+        return kept
+
+    # Positions [i, j) of the periods starting in [range_start, range_end), found by binary
+    # search; either bound may be None
+    def span(self, range_start=None, range_end=None):
+        import numpy as np
+
+        i = 0 if range_start is None else int(np.searchsorted(self._starts, to_minute(range_start), side='left'))
+        j = len(self) if range_end is None else int(np.searchsorted(self._starts, to_minute(range_end), side='left'))
+        return i, max(i, j)
+
+    # Removes the periods with the given (start, end) pairs in one pass; pairs not in the
+    # index are ignored. Returns the periods that were removed.
+    def bulk_remove(self, keys):
+        import numpy as np
+
+        keys = list(keys)
+        if not keys or not len(self):
+            return []
+        starts = to_minute_array([key[0] for key in keys])
+        ends = to_minute_array([key[1] for key in keys])
+        i = np.minimum(np.searchsorted(self._starts, starts, side='left'), len(self) - 1)
+        found = np.unique(i[(self._starts[i] == starts) & (self._ends[i] == ends)])
+        removed = list(zip(self._starts[found].tolist(), self._ends[found].tolist(),
+                           (self._flags[found] & FLAG_ON_CALL).astype(bool).tolist()))
+        self._starts = np.delete(self._starts, found)
+        self._ends = np.delete(self._ends, found)
+        self._flags = np.delete(self._flags, found)
+        return removed
+
+    def remove(self, start, end):
+        import numpy as np
+
+        start = to_minute(start)
+        i = int(np.searchsorted(self._starts, start, side='left'))
+        if i < len(self) and self._starts[i] == start and self._ends[i] == to_minute(end):
+            self._starts = np.delete(self._starts, i)
+            self._ends = np.delete(self._ends, i)
+            self._flags = np.delete(self._flags, i)
+            return True
+        return False
+
+# Function to apply a batch of deletions and edits to a WorkPeriodIndex in one update. deleted
+# holds (start, end) keys; edited holds (old key, new (start, end, is_on_call)) pairs. An edit
+# that would overlap another period (including another edit in the batch), or end before it
+# starts, is rejected and the old period is put back. Returns (removed periods, added periods,
+# rejected edits), so a saved copy of the schedule can be kept in step.
+def apply_period_changes(work_periods, deleted, edited):
+    removed = work_periods.bulk_remove(list(deleted) + [old for old, _ in edited])
+    removed_periods = {(start, end): (start, end, is_on_call) for start, end, is_on_call in removed}
+    edited = [(old, new) for old, new in edited if tuple(to_minute(t).item() for t in old) in removed_periods]
+    starts, ends, flags = as_period_arrays([new for _, new in edited])
+    # Acceptance is tracked per edit, so two edits onto the same slot can't both count as added
+    kept = work_periods.insert_arrays(starts, ends, flags)
+    added = sorted(zip(starts[kept].tolist(), ends[kept].tolist(),
+                       (flags[kept] & FLAG_ON_CALL).astype(bool).tolist()))
+
+    rejected = [edit for edit, is_kept in zip(edited, kept.tolist()) if not is_kept]
+    for old, _ in rejected:
+        key = tuple(to_minute(t).item() for t in old)
+        # An accepted edit may have taken the old period's place, in which case it stays removed
+        if work_periods.insert(removed_periods[key]):
+            del removed_periods[key]
+    return list(removed_periods.values()), added, rejected
+
+# Function to lazily generate the work periods of a recurring rotation, in start order.
+# shift_rules are dateutil rrules giving shift start times.
+def iter_rotation_periods(shift_rules, shift_hours, until, is_on_call=False):
+    from dateutil.rrule import rruleset
+
+    shift_starts = rruleset()
+    for shift_rule in shift_rules:
+        shift_starts.rrule(shift_rule)
+    for shift_start in shift_starts:
+        if shift_start >= until:
+            break
+        yield shift_start, shift_start + timedelta(hours=shift_hours), is_on_call
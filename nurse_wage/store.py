@@ -0,0 +1,131 @@
+# Optional local SQLite store for work periods and computed weekly results, kept per profile
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# The database lives in the user's home directory unless NURSE_WAGE_DB points elsewhere
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser('~'), '.nurse_wage', 'schedule.db')
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS work_periods (
+    profile TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    is_on_call INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (profile, start_time, end_time)
+);
+CREATE INDEX IF NOT EXISTS work_periods_end ON work_periods (profile, end_time);
+CREATE TABLE IF NOT EXISTS weekly_summaries (
+    profile TEXT NOT NULL,
+    week_start TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (profile, week_start)
+);
+'''
+
+# Function to find the database path: NURSE_WAGE_DB if set, else DEFAULT_STORE_PATH
+def default_store_path():
+    return os.environ.get('NURSE_WAGE_DB', DEFAULT_STORE_PATH)
+
+# Work periods are stored as ISO 8601 text, which sorts in time order, so the primary key
+# (profile, start_time, end_time) and the (profile, end_time) index answer date-range
+# queries without scanning a profile's whole history. One connection is shared by all
+# threads behind a lock.
+class ScheduleStore:
+    def __init__(self, path=None):
+        path = path or default_store_path()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(_schema)
+
+    def close(self):
+        self._connection.close()
+
+    def profiles(self):
+        with self._lock:
+            rows = self._connection.execute('SELECT DISTINCT profile FROM work_periods ORDER BY profile')
+            return [profile for profile, in rows]
+
+    # Adds work periods in a single transaction; periods that are already stored are skipped
+    def add_periods(self, profile, work_periods):
+        rows = ((profile, start.isoformat(), end.isoformat(), int(is_on_call))
+                for start, end, is_on_call in work_periods)
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO work_periods (profile, start_time, end_time, is_on_call) VALUES (?, ?, ?, ?)',
+                rows,
+            )
+
+    def remove_periods(self, profile, keys):
+        rows = ((profile, start.isoformat(), end.isoformat()) for start, end in keys)
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'DELETE FROM work_periods WHERE profile = ? AND start_time = ? AND end_time = ?', rows
+            )
+
+    # Loads work periods sorted by start time. With a range, only periods overlapping
+    # [range_start, range_end) are read.
+    def load_periods(self, profile, range_start=None, range_end=None):
+        query = 'SELECT start_time, end_time, is_on_call FROM work_periods WHERE profile = ?'
+        params = [profile]
+        if range_end is not None:
+            query += ' AND start_time < ?'
+            params.append(range_end.isoformat())
+        if range_start is not None:
+            query += ' AND end_time > ?'
+            params.append(range_start.isoformat())
+        query += ' ORDER BY start_time'
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [(datetime.fromisoformat(start), datetime.fromisoformat(end), bool(is_on_call))
+                for start, end, is_on_call in rows]
+
+    # Saves the weekly summaries of an earnings run, each with the digest of its week from
+    # pay.week_digests. A profile keeps one summary per week: the run's weeks replace whatever
+    # was saved from start to end of the run, including weeks that no longer have any pay.
+    def save_weekly_summaries(self, profile, weekly_data, digests):
+        if not digests:
+            return
+        digests = {week_start.isoformat(): digest for week_start, digest in digests.items()}
+        rows = []
+        for week in weekly_data:
+            week_start = week['week_start'].isoformat()
+            if week_start in digests:
+                summary = {key: (value.isoformat() if hasattr(value, 'isoformat') else value)
+                           for key, value in week.items()}
+                rows.append((profile, week_start, digests[week_start], json.dumps(summary, default=float)))
+        with self._lock, self._connection:
+            self._connection.execute(
+                'DELETE FROM weekly_summaries WHERE profile = ? AND week_start BETWEEN ? AND ?',
+                (profile, min(digests), max(digests)),
+            )
+            self._connection.executemany(
+                'INSERT INTO weekly_summaries (profile, week_start, digest, summary) VALUES (?, ?, ?, ?)', rows
+            )
+
+    # Loads the saved summaries of the weeks in digests ({week start: digest}) whose saved
+    # digest still matches, i.e. whose shifts and pricing inputs haven't changed since. Returns
+    # them in week order.
+    def load_weekly_summaries(self, profile, digests):
+        if not digests:
+            return []
+        digests = {week_start.isoformat(): digest for week_start, digest in digests.items()}
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT week_start, digest, summary FROM weekly_summaries '
+                'WHERE profile = ? AND week_start BETWEEN ? AND ? ORDER BY week_start',
+                (profile, min(digests), max(digests)),
+            ).fetchall()
+        weekly_data = []
+        for week_start, digest, summary in rows:
+            if digests.get(week_start) == digest:
+                week = json.loads(summary)
+                week['week_start'] = datetime.fromisoformat(week['week_start'])
+                weekly_data.append(week)
+        return weekly_data
@@ -0,0 +1,72 @@
+# What-if rate sweeps. Which hours are night, weekend, on call or overtime never depends on
+# the rates, so a schedule is classified once and any number of rate combinations are priced
+# from that classification with a single matrix product.
+import itertools
+
+from nurse_wage.overtime import apply_overtime
+from nurse_wage.pay import price_segments, split_period_arrays
+from nurse_wage.rules import DAY_SHIFT_START_HOUR, NIGHT_SHIFT_START_HOUR
+from nurse_wage.schedule import as_period_arrays
+
+# Rate parameters that can be swept, in the order build_rate_grid expects them
+rate_parameters = ['hourly_rate', 'charge_nurse_pay', 'night_differential', 'weekend_differential',
+                   'on_call_differential']
+
+# Per-week hour categories produced by classify_hours. "Paid" hours count overtime hours
+# times their overtime multiplier, so they price regular and overtime pay together.
+hour_categories = ['paid_hours', 'night_paid_hours', 'weekend_paid_hours', 'on_call_paid_hours']
+
+# Function to classify a schedule (sorted by start time) into per-week hour counts by category,
+# including the regular/overtime split
+def classify_hours(work_periods, week_start_day=0, weekly_overtime_hours=40, daily_overtime_rules=(),
+                   workday_start_hour=0):
+    import pandas as pd
+
+    # Segments are also cut where workdays begin, so each falls in one workday
+    day_boundaries = (DAY_SHIFT_START_HOUR * 60, NIGHT_SHIFT_START_HOUR * 60, workday_start_hour * 60)
+    segments = split_period_arrays(*as_period_arrays(work_periods), day_boundaries)
+    df = price_segments(segments, 0.0, 0.0, 0.0, 0.0, 0.0, "Dollar Amount")
+    if df.empty:
+        return pd.DataFrame(columns=['regular_hours', 'overtime_hours'] + hour_categories)
+    df = apply_overtime(df, week_start_day, weekly_overtime_hours, daily_overtime_rules, workday_start_hour)
+
+    paid_hours = df['regular_hours'] + df['overtime_paid_hours']
+    df_classes = pd.DataFrame({
+        'week': df['week'],
+        'regular_hours': df['regular_hours'],
+        'overtime_hours': df['overtime_hours'],
+        'paid_hours': paid_hours,
+        'night_paid_hours': paid_hours * df['is_night'],
+        'weekend_paid_hours': paid_hours * df['is_weekend'],
+        'on_call_paid_hours': paid_hours * df['is_on_call'],
+    })
+    return df_classes.groupby('week', sort=True).sum()
+
+# Function to build every combination of the given values for each rate parameter.
+# Parameters that aren't varied are passed a single value.
+def build_rate_grid(hourly_rate, charge_nurse_pay, night_differential, weekend_differential,
+                    on_call_differential):
+    import pandas as pd
+
+    values = [hourly_rate, charge_nurse_pay, night_differential, weekend_differential, on_call_differential]
+    values = [v if hasattr(v, '__iter__') else [v] for v in values]
+    return pd.DataFrame(list(itertools.product(*values)), columns=rate_parameters)
+
+# Function to price every row of a rate grid against a classified schedule. Each row becomes
+# a vector of hourly amounts per hour category, and the weekly earnings of all rows are one
+# (rows x categories) @ (categories x weeks) product. Returns the grid with total_earnings
+# added, and the (rows x weeks) earnings matrix.
+def sweep_rates(df_classes, rate_grid, differential_type):
+    import numpy as np
+
+    hourly_rate = rate_grid['hourly_rate'].to_numpy(dtype=float)
+    differentials = rate_grid[['night_differential', 'weekend_differential', 'on_call_differential']].to_numpy(dtype=float)
+    if differential_type == "Percentage":
+        differentials = differentials * hourly_rate[:, None] / 100
+
+    amounts = np.column_stack([hourly_rate + rate_grid['charge_nurse_pay'].to_numpy(dtype=float), differentials])
+    weekly_earnings = amounts @ df_classes[hour_categories].to_numpy(dtype=float).T
+
+    df_sweep = rate_grid.copy()
+    df_sweep['total_earnings'] = weekly_earnings.sum(axis=1)
+    return df_sweep, weekly_earnings
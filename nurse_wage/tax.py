@@ -0,0 +1,128 @@
+# Federal and state tax estimates
+import functools
+
+# Function to precompute a tax table from tax brackets: the lower edge and rate of each
+# bracket, and the tax owed on all income below that edge
+def build_tax_table(tax_brackets):
+    import numpy as np
+
+    lower_limits = np.array([bracket[0] for bracket in tax_brackets], dtype=float)
+    upper_limits = np.array([bracket[1] for bracket in tax_brackets], dtype=float)
+    rates = np.array([bracket[2] for bracket in tax_brackets], dtype=float)
+    full_bracket_tax = (upper_limits[:-1] - lower_limits[:-1]) * rates[:-1]
+    tax_below = np.concatenate(([0.0], np.cumsum(full_bracket_tax)))
+    return lower_limits, rates, tax_below
+
+# Function to calculate federal tax for a whole array of annual incomes at once:
+# one searchsorted to find each income's bracket, then one multiply-add
+def calculate_federal_tax(incomes, tax_table):
+    import numpy as np
+
+    lower_limits, rates, tax_below = tax_table
+    incomes = np.asarray(incomes, dtype=float)
+    bracket = np.maximum(np.searchsorted(lower_limits, incomes, side='right') - 1, 0)
+    tax = tax_below[bracket] + (incomes - lower_limits[bracket]) * rates[bracket]
+    return np.where(incomes > lower_limits[0], tax, 0.0)
+
+# Function to calculate federal and state tax on earnings for part of a year. Federal brackets
+# are annual, so earnings are annualized, taxed, and the tax is scaled back to the period.
+def calculate_period_tax(period_earnings, periods_per_year, tax_table, state_tax_rate):
+    import numpy as np
+
+    period_earnings = np.asarray(period_earnings, dtype=float)
+    annual_earnings = period_earnings * periods_per_year
+    federal_tax = calculate_federal_tax(annual_earnings, tax_table) / periods_per_year
+    state_tax = period_earnings * (state_tax_rate / 100.0)
+    return federal_tax, state_tax
+
+# Federal tax brackets for 2023
+federal_tax_brackets = {
+    'Single': [
+        (0, 11000, 0.10),
+        (11000, 44725, 0.12),
+        (44725, 95375, 0.22),
+        (95375, 182100, 0.24),
+        (182100, 231250, 0.32),
+        (231250, 578125, 0.35),
+        (578125, float('inf'), 0.37)
+    ],
+    'Married Filing Jointly': [
+        (0, 22000, 0.10),
+        (22000, 89450, 0.12),
+        (89450, 190750, 0.22),
+        (190750, 364200, 0.24),
+        (364200, 462500, 0.32),
+        (462500, 693750, 0.35),
+        (693750, float('inf'), 0.37)
+    ],
+    'Head of Household': [
+        (0, 15700, 0.10),
+        (15700, 59850, 0.12),
+        (59850, 95350, 0.22),
+        (95350, 182100, 0.24),
+        (182100, 231250, 0.32),
+        (231250, 578100, 0.35),
+        (578100, float('inf'), 0.37)
+    ]
+}
+
+# Function to get the precomputed tax table for a filing status (built once, on first use)
+@functools.lru_cache(maxsize=None)
+def get_federal_tax_table(filing_status):
+    return build_tax_table(federal_tax_brackets[filing_status])
+
+# Dictionary of state tax rates (approximate highest marginal rates)
+state_tax_rates = {
+    # ... [Same as before]
+    'Alabama': 5.0,
+    'Alaska': 0.0,
+    'Arizona': 4.50,
+    'Arkansas': 5.90,
+    'California': 13.30,
+    'Colorado': 4.55,
+    'Connecticut': 6.99,
+    'Delaware': 6.60,
+    'Florida': 0.0,
+    'Georgia': 5.75,
+    'Hawaii': 11.00,
+    'Idaho': 6.925,
+    'Illinois': 4.95,
+    'Indiana': 3.23,
+    'Iowa': 8.53,
+    'Kansas': 5.70,
+    'Kentucky': 5.0,
+    'Louisiana': 6.0,
+    'Maine': 7.15,
+    'Maryland': 5.75,
+    'Massachusetts': 5.0,
+    'Michigan': 4.25,
+    'Minnesota': 9.85,
+    'Mississippi': 5.0,
+    'Missouri': 5.40,
+    'Montana': 6.90,
+    'Nebraska': 6.84,
+    'Nevada': 0.0,
+    'New Hampshire': 5.0,  # Dividends and interest income only
+    'New Jersey': 10.75,
+    'New Mexico': 5.90,
+    'New York': 8.82,
+    'North Carolina': 5.25,
+    'North Dakota': 2.90,
+    'Ohio': 4.797,
+    'Oklahoma': 5.0,
+    'Oregon': 9.90,
+    'Pennsylvania': 3.07,
+    'Rhode Island': 5.99,
+    'South Carolina': 7.0,
+    'South Dakota': 0.0,
+    'Tennessee': 0.0,
+    'Texas': 0.0,
+    'Utah': 4.95,
+    'Vermont': 8.75,
+    'Virginia': 5.75,
+    'Washington': 0.0,
+    'West Virginia': 6.50,
+    'Wisconsin': 7.65,
+    'Wyoming': 0.0,
+    'District of Columbia': 8.95
+}
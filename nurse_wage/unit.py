@@ -0,0 +1,115 @@
+# Unit-level schedules: many staff members' .ics exports (or zip files of them) are parsed in
+# parallel, merged into one schedule per person and priced per person, with a unit total.
+# Work goes to any concurrent.futures executor; a process pool spreads parsing and pricing
+# across cores, and without an executor everything runs in the calling thread.
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from nurse_wage.ics import DEFAULT_ON_CALL_KEYWORD, ics_cache_key, parse_ics_bytes
+from nurse_wage.pay import calculate_total_earnings
+from nurse_wage.reconcile import expected_pay_breakdown
+from nurse_wage.schedule import WorkPeriodIndex
+
+# Function to create a process pool for unit imports. Workers are spawned rather than forked,
+# since forking a multi-threaded server process can deadlock.
+def make_process_pool(max_workers=None):
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                               mp_context=multiprocessing.get_context('spawn'))
+
+# Function to name the person a schedule file belongs to, from its file name
+# (e.g. "exports.zip/Jane Doe.ics" -> "Jane Doe")
+def person_name(file_name):
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+# Function to expand uploads, given as (file name, bytes) pairs, into .ics files, opening zip
+# files. Returns the .ics files and a report entry for each upload that couldn't be opened.
+def expand_uploads(uploads):
+    ics_files = []
+    errors = []
+    for name, data in uploads:
+        if not name.lower().endswith('.zip'):
+            ics_files.append((name, data))
+            continue
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for member in archive.infolist():
+                    member_name = os.path.basename(member.filename)
+                    if member.is_dir() or member_name.startswith('.') or '__MACOSX' in member.filename:
+                        continue
+                    if member_name.lower().endswith('.ics'):
+                        ics_files.append((f"{name}/{member.filename}", archive.read(member)))
+        except (zipfile.BadZipFile, OSError) as e:
+            errors.append({'file': name, 'person': None, 'work_periods': 0, 'error': str(e)})
+    return ics_files, errors
+
+# Function to parse one .ics file into a ParsedCalendar. Runs in a worker process, so errors
+# are returned instead of raised; the parsed file pickles as a few compact arrays.
+def parse_ics_file(data, on_call_keyword=DEFAULT_ON_CALL_KEYWORD):
+    try:
+        return parse_ics_bytes(data, on_call_keyword), None
+    except Exception as e:
+        return None, str(e)
+
+# Function to parse .ics files in parallel and merge them into one WorkPeriodIndex per person.
+# Overlapping periods from a person's files are kept once. Files found in cache (an LRUCache
+# keyed by ics_cache_key) aren't parsed again, and newly parsed ones are added to it. Returns
+# (schedules, report), where report has one entry per file with its person, number of periods
+# added and any error.
+def import_unit_schedules(uploads, executor=None, on_call_keyword=DEFAULT_ON_CALL_KEYWORD, cache=None):
+    ics_files, report = expand_uploads(uploads)
+    keys = [ics_cache_key(data, on_call_keyword) for _, data in ics_files]
+    cached = [cache.get(key) if cache is not None else None for key in keys]
+
+    # Parse the files that weren't cached
+    to_parse = [data for (_, data), parsed in zip(ics_files, cached) if parsed is None]
+    if executor is not None:
+        parsed_files = executor.map(parse_ics_file, to_parse, [on_call_keyword] * len(to_parse))
+    else:
+        parsed_files = (parse_ics_file(data, on_call_keyword) for data in to_parse)
+
+    schedules = {}
+    for (name, _), key, parsed in zip(ics_files, keys, cached):
+        entry = {'file': name, 'person': person_name(name), 'work_periods': 0, 'error': None}
+        if parsed is None:
+            parsed, entry['error'] = next(parsed_files)
+            if parsed is not None and cache is not None:
+                cache.put(key, parsed)
+        if parsed is not None and not len(parsed.starts):
+            entry['error'] = 'No work periods found'
+        elif parsed is not None:
+            schedule = schedules.setdefault(entry['person'], WorkPeriodIndex())
+            entry['work_periods'] = int(schedule.insert_arrays(parsed.starts, parsed.ends, parsed.flags).sum())
+        report.append(entry)
+    return schedules, report
+
+# Function to price one person's schedule; runs in a worker process. The expected pay per
+# week and category is returned too, for reconciling against the unit's pay records.
+def price_person(person, work_periods, rates, overtime_rules, rules):
+    total_earnings, total_hours, weekly_data, df_hours = calculate_total_earnings(
+        work_periods, *rates, *overtime_rules, rules=rules
+    )
+    return {'person': person, 'work_periods': len(work_periods), 'total_hours': float(total_hours),
+            'total_earnings': float(total_earnings), 'weeks': weekly_data,
+            'expected_pay': expected_pay_breakdown(df_hours).assign(person=person)}
+
+# Function to price every person's schedule, in parallel when an executor is given. Returns
+# the per-person results (sorted by person) and the unit totals.
+def calculate_unit_earnings(schedules, rates, overtime_rules, rules=None, executor=None):
+    people = sorted(schedules)
+    if executor is not None:
+        results = list(executor.map(price_person, people, [schedules[person] for person in people],
+                                    [rates] * len(people), [overtime_rules] * len(people),
+                                    [rules] * len(people)))
+    else:
+        results = [price_person(person, schedules[person], rates, overtime_rules, rules) for person in people]
+
+    unit_total = {
+        'people': len(results),
+        'work_periods': sum(result['work_periods'] for result in results),
+        'total_hours': sum(result['total_hours'] for result in results),
+        'total_earnings': sum(result['total_earnings'] for result in results),
+    }
+    return results, unit_total
@@ -0,0 +1,173 @@
+# Data preparation for the earnings chart, the work period table and the calendar view
+import calendar
+import functools
+
+# Readable labels for the earning types shown in the chart
+earning_type_labels = {
+    'base_pay': 'Base Pay',
+    'charge_nurse_pay': 'Charge Nurse Pay',
+    'night_diff_pay': 'Night Differential',
+    'weekend_diff_pay': 'Weekend Differential',
+    'on_call_diff_pay': 'On-Call Differential',
+    'overtime_earnings': 'Overtime Pay'
+}
+
+# Function to label an earnings column, including differentials from a custom rule table
+# (e.g. 'holiday_diff_pay' -> 'Holiday Differential')
+def earning_type_label(column):
+    if column in earning_type_labels:
+        return earning_type_labels[column]
+    return column.removesuffix('_diff_pay').replace('_', ' ').title() + ' Differential'
+
+# Function to list the earnings columns of weekly results in chart order
+def earning_type_columns(df_weekly):
+    differentials = [column for column in df_weekly.columns
+                     if column.endswith('_diff_pay') and column not in earning_type_labels]
+    columns = list(earning_type_labels)
+    return columns[:-1] + differentials + columns[-1:]
+
+# The chart never draws more bars than this, so the Vega spec sent to the browser stays small
+MAX_CHART_BARS = 104
+
+# Period label formats for each chart granularity; weeks are grouped by the day they start on
+chart_granularities = {
+    'Week': '%Y-%m-%d',
+    'Month': '%Y-%m',
+    'Year': '%Y',
+}
+
+# Function to pick the finest granularity that shows the whole date span in at most max_bars bars
+def choose_chart_granularity(first_week_start, last_week_start, max_bars=MAX_CHART_BARS):
+    weeks = (last_week_start - first_week_start).days // 7 + 1
+    if weeks <= max_bars:
+        return 'Week'
+    months = (last_week_start.year - first_week_start.year) * 12 + last_week_start.month - first_week_start.month + 1
+    if months <= max_bars:
+        return 'Month'
+    return 'Year'
+
+# Function to sum weekly earnings into one row per period and earning type for a stacked bar chart
+def prepare_chart_data(weekly_data, granularity=None):
+    import pandas as pd
+
+    df_weekly = pd.DataFrame(weekly_data)
+    if granularity is None:
+        granularity = choose_chart_granularity(df_weekly['week_start'].iloc[0], df_weekly['week_start'].iloc[-1])
+
+    period = pd.to_datetime(df_weekly['week_start']).dt.strftime(chart_granularities[granularity])
+    df_periods = df_weekly.groupby(period, sort=True)[earning_type_columns(df_weekly)].sum()
+    df_melted = df_periods.rename_axis('period').reset_index().melt(
+        id_vars=['period'],
+        var_name='Earning Type',
+        value_name='Amount'
+    )
+    # Zero amounts add nothing to a stacked bar, so they are left out of the payload
+    df_melted = df_melted[df_melted['Amount'] != 0]
+    df_melted['Amount'] = df_melted['Amount'].round(2)
+    df_melted['Earning Type'] = df_melted['Earning Type'].map(earning_type_label)
+    return df_melted.reset_index(drop=True)
+
+# Work period table columns, in display order
+work_period_columns = ['delete', 'start', 'end', 'on_call', 'shift']
+
+# Function to build one page of the work period table from rows [i, j) of a WorkPeriodIndex.
+# Only the rows on the page are converted, so the cost doesn't depend on the schedule's length.
+def work_period_table(work_periods, i, j):
+    import numpy as np
+    import pandas as pd
+
+    from nurse_wage.rules import DAY_SHIFT_START_HOUR, NIGHT_SHIFT_START_HOUR
+    from nurse_wage.schedule import FLAG_ON_CALL
+
+    starts = pd.DatetimeIndex(work_periods.starts[i:j])
+    is_night = (starts.hour >= NIGHT_SHIFT_START_HOUR) | (starts.hour < DAY_SHIFT_START_HOUR)
+    return pd.DataFrame({
+        'delete': np.zeros(len(starts), dtype=bool),
+        'start': starts,
+        'end': pd.DatetimeIndex(work_periods.ends[i:j]),
+        'on_call': (work_periods.flags[i:j] & FLAG_ON_CALL).astype(bool),
+        'shift': np.where(is_night, 'Night Shift', 'Day Shift'),
+    }, index=pd.RangeIndex(i, j))
+
+# Function to compare an edited page of the work period table with the original. Returns the
+# (start, end) keys of rows to delete, and (old key, new period) pairs for edited rows.
+def work_period_changes(df_original, df_edited):
+    deleted = []
+    edited = []
+    for old, new in zip(df_original.itertuples(), df_edited.itertuples()):
+        key = (old.start.to_pydatetime(), old.end.to_pydatetime())
+        if new.delete:
+            deleted.append(key)
+        elif (new.start, new.end, new.on_call) != (old.start, old.end, old.on_call):
+            edited.append((key, (new.start.to_pydatetime(), new.end.to_pydatetime(), bool(new.on_call))))
+    return deleted, edited
+
+# Function to total the hours and earnings of each calendar day from hour-level rows
+# (df_hours from calculate_total_earnings; segments never cross midnight). Returns
+# {date: (hours, earnings)}.
+def get_daily_totals(df_hours):
+    days = df_hours['datetime'].dt.normalize()
+    earnings = df_hours['regular_earnings'] + df_hours['overtime_earnings']
+    df_days = df_hours[['hours']].assign(earnings=earnings).groupby(days, sort=True).sum()
+    return dict(zip(df_days.index.date, zip(df_days['hours'].tolist(), df_days['earnings'].tolist())))
+
+# Shading of a worked day, from lightest to darkest; a day is shaded by its share of the
+# busiest day's value
+calendar_shades = ['#d4f5d4', '#b2ecb2', '#90ee90', '#5cd65c', '#2eb82e']
+
+calendar_header = ''.join(
+    f'<th class="{calendar.day_abbr[day].lower()}">{calendar.day_abbr[day]}</th>'
+    for day in calendar.Calendar(calendar.SUNDAY).iterweekdays()
+)
+
+# Function to render one month as an HTML table. days holds (day of month, shade level, hours,
+# earnings) for the worked days, with None totals when only the date is known. Months are
+# cached, so a month is only rendered again when its own worked days change.
+@functools.lru_cache(maxsize=4096)
+def render_month_html(year, month, days):
+    worked = {day: (level, hours, earnings) for day, level, hours, earnings in days}
+    rows = []
+    for week in calendar.Calendar(calendar.SUNDAY).monthdayscalendar(year, month):
+        cells = []
+        for day in week:
+            if day == 0:
+                cells.append('<td class="noday">&nbsp;</td>')
+            elif day in worked:
+                level, hours, earnings = worked[day]
+                tooltip = 'Worked' if hours is None else f'{hours:g} hours, ${earnings:,.2f}'
+                cells.append(f'<td style="background-color: {calendar_shades[level]}; font-weight: bold;" '
+                             f'title="{tooltip}">{day}</td>')
+            else:
+                cells.append(f'<td>{day}</td>')
+        rows.append(f"<tr>{''.join(cells)}</tr>")
+    return (f"<h3 style='text-align:center;'>{calendar.month_name[month]} {year}</h3>"
+            f'<table border="0" cellpadding="0" cellspacing="0" class="month">'
+            f"<tr>{calendar_header}</tr>{''.join(rows)}</table>")
+
+# Function to render HTML calendars for all months from the first to the last worked date.
+# work_days is either a collection of worked dates, or {date: (hours, earnings)} from
+# get_daily_totals, in which case days are shaded by shade_by ('hours' or 'earnings').
+def build_calendar_html(work_days, shade_by='hours'):
+    if not isinstance(work_days, dict):
+        work_days = dict.fromkeys(work_days, (None, None))
+    if not work_days:
+        return ""
+
+    value_index = 0 if shade_by == 'hours' else 1
+    busiest = max((totals[value_index] or 0 for totals in work_days.values()), default=0) or 1
+    levels = len(calendar_shades)
+
+    # Group the worked days by month, with their shade level
+    months = {}
+    for day in sorted(work_days):
+        hours, earnings = totals = work_days[day]
+        level = 2 if hours is None else min(int(totals[value_index] / busiest * levels), levels - 1)
+        months.setdefault((day.year, day.month), []).append((day.day, level, hours, earnings))
+
+    first_year, first_month = min(months)
+    last_year, last_month = max(months)
+    calendars_html = []
+    for month_number in range(first_year * 12 + first_month - 1, last_year * 12 + last_month):
+        year, month = divmod(month_number, 12)
+        calendars_html.append(render_month_html(year, month + 1, tuple(months.get((year, month + 1), ()))))
+    return ''.join(calendars_html)
@@ -1,293 +1,158 @@
 import streamlit as st
-from datetime import datetime, timedelta, date
-from collections import defaultdict
+import io
+from datetime import datetime, timedelta, date, time
 import pandas as pd
+import numpy as np
 import altair as alt
 import calendar
 from dateutil.relativedelta import relativedelta
-from bs4 import BeautifulSoup
-from icalendar import Calendar, Event
-import io
-
-# Function definitions
-def determine_shift_differential(hour):
-    if 19 <= hour or hour < 7:
-        return 'Night Shift'
+from dateutil.rrule import rrule, WEEKLY, MO, TU, WE, TH, FR, SA, SU
+from concurrent.futures.process import BrokenProcessPool
+from nurse_wage.cache import LRUCache
+from nurse_wage.export import export_formats, export_hours, export_weeks
+from nurse_wage.jobs import EarningsJob, make_worker_pool
+from nurse_wage.ics import DEFAULT_ON_CALL_KEYWORD, load_ics_work_periods
+from nurse_wage.pay import calculate_total_earnings, determine_shift_differential, week_digests
+from nurse_wage.profiling import StageTimer
+from nurse_wage.reconcile import actual_pay_breakdown, read_pay_records, reconcile_pay, reconcile_pay_records
+from nurse_wage.rules import RuleTable, rule_table_from_config
+from nurse_wage.schedule import WorkPeriodIndex, apply_period_changes, iter_rotation_periods
+from nurse_wage.store import ScheduleStore
+from nurse_wage.sweep import build_rate_grid, classify_hours, sweep_rates
+from nurse_wage.tax import calculate_period_tax, get_federal_tax_table, state_tax_rates
+from nurse_wage.unit import calculate_unit_earnings, import_unit_schedules, make_process_pool
+from nurse_wage.views import (
+    build_calendar_html, chart_granularities, choose_chart_granularity, earning_type_label, earning_type_labels,
+    get_daily_totals, prepare_chart_data, work_period_changes, work_period_table
+)
+
+# Per-week results shared by all sessions; keys include every input, so sharing is safe
+@st.cache_resource
+def get_week_cache():
+    return LRUCache(maxsize=4096)
+
+# Parsed .ics files shared by all sessions, keyed by a hash of the file and the parsing options.
+# Teams often upload the same unit calendar, so a file is only parsed the first time it is seen.
+@st.cache_resource
+def get_ics_cache():
+    return LRUCache(maxsize=256, maxbytes=64 * 1024 * 1024, sizeof=lambda parsed: parsed.nbytes)
+
+# Worker pool shared by the earnings runs of all sessions
+@st.cache_resource
+def get_worker_pool():
+    return make_worker_pool()
+
+# Process pool shared by the unit imports of all sessions; .ics parsing is pure Python, so
+# spreading files across processes is what lets it use every core
+@st.cache_resource
+def get_process_pool():
+    return make_process_pool()
+
+# One SQLite connection for the saved schedules of all sessions
+@st.cache_resource
+def get_schedule_store():
+    return ScheduleStore()
+
+# Function to write an exported table into bytes for a download button. The bytes are cached
+# per earnings run (job_key) and format, so reruns that show the same results don't rebuild
+# them; the table itself isn't hashed, since job_key already identifies it. A rule table in the
+# key is hashed by its repr, which lists its rules and holidays.
+@st.cache_data(max_entries=8, hash_funcs={RuleTable: repr})
+def export_bytes(job_key, table_name, file_format, _table):
+    export = export_hours if table_name == 'hours' else export_weeks
+    buffer = io.BytesIO()
+    export(_table, buffer, file_format)
+    return buffer.getvalue()
+
+# Function to show a pay reconciliation: a summary, the flagged rows and a CSV download
+def show_reconciliation(df_reconciled, file_name):
+    df_flagged = df_reconciled[df_reconciled['flagged']]
+    if df_flagged.empty:
+        st.success(f"All {len(df_reconciled)} week/category amounts match the pay records.")
     else:
-        return 'Day Shift'
-
-def is_weekend(date):
-    return date.weekday() >= 5  # 5 = Saturday (5), 6 = Sunday (6)
-
-def check_overlap(new_start, new_end, existing_periods):
-    for start, end, _ in existing_periods:
-        if new_start < end and new_end > start:
-            return True
-    return False
-
-# Function to calculate federal tax based on tax brackets
-def calculate_federal_tax(income, tax_brackets):
-    tax = 0.0
-    for bracket in tax_brackets:
-        lower_limit, upper_limit, rate = bracket
-        if income > lower_limit:
-            taxable_amount = min(income, upper_limit) - lower_limit
-            tax += taxable_amount * rate
-        else:
-            break
-    return tax
-
-# Function to calculate total earnings with detailed breakdown
-@st.cache_data
-def calculate_total_earnings(work_periods, hourly_rate, charge_nurse_pay, night_differential,
-                             weekend_differential, on_call_differential, differential_type):
-    hours_worked = []
-    for start_time, end_time, is_on_call in work_periods:
-        current_time = start_time
-        while current_time < end_time:
-            week_start = current_time - timedelta(days=current_time.weekday())
-            week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-            differential = determine_shift_differential(current_time.hour)
-            weekend = is_weekend(current_time)
-            base_rate = hourly_rate
-
-            # Initialize earnings components
-            rate = base_rate
-            base_pay = base_rate
-            night_diff_pay = 0.0
-            weekend_diff_pay = 0.0
-            on_call_diff_pay = 0.0
-            charge_nurse_pay_hour = 0.0
-
-            if charge_nurse_pay > 0:
-                charge_nurse_pay_hour = charge_nurse_pay
-                rate += charge_nurse_pay
-
-            if differential == 'Night Shift':
-                if differential_type == "Percentage":
-                    night_diff_pay = base_rate * (night_differential / 100)
-                else:
-                    night_diff_pay = night_differential
-                rate += night_diff_pay
-
-            if weekend:
-                if differential_type == "Percentage":
-                    weekend_diff_pay = base_rate * (weekend_differential / 100)
-                else:
-                    weekend_diff_pay = weekend_differential
-                rate += weekend_diff_pay
-
-            if is_on_call:
-                if differential_type == "Percentage":
-                    on_call_diff_pay = base_rate * (on_call_differential / 100)
-                else:
-                    on_call_diff_pay = on_call_differential
-                rate += on_call_diff_pay
-
-            total_hourly_rate = rate
-
-            hours_worked.append({
-                'datetime': current_time,
-                'week_start': week_start,
-                'base_pay': base_pay,
-                'charge_nurse_pay': charge_nurse_pay_hour,
-                'night_diff_pay': night_diff_pay,
-                'weekend_diff_pay': weekend_diff_pay,
-                'on_call_diff_pay': on_call_diff_pay,
-                'total_hourly_rate': total_hourly_rate
-            })
-            current_time += timedelta(hours=1)
-
-    # Create DataFrame from hours_worked
-    df_hours = pd.DataFrame(hours_worked)
-
-    # Group by week and calculate earnings components
-    df_hours['week'] = df_hours['week_start'].dt.strftime('%Y-%U')
-    week_groups = df_hours.groupby('week')
-
-    weekly_data = []
-    total_hours = 0
-    total_earnings = 0
-
-    for week, group in week_groups:
-        hours = len(group)
-        total_hours += hours
-
-        # Sum earnings components
-        base_pay = group['base_pay'].sum()
-        charge_nurse_pay_total = group['charge_nurse_pay'].sum()
-        night_diff_pay_total = group['night_diff_pay'].sum()
-        weekend_diff_pay_total = group['weekend_diff_pay'].sum()
-        on_call_diff_pay_total = group['on_call_diff_pay'].sum()
-        total_weekly_pay = group['total_hourly_rate'].sum()
-
-        # Overtime calculations
-        if hours > 40:
-            regular_hours = 40
-            overtime_hours = hours - 40
-
-            # Calculate regular earnings
-            regular_earnings = group.iloc[:40]['total_hourly_rate'].sum()
-
-            # Calculate overtime earnings at 1.5x rate
-            overtime_rates = group.iloc[40:]['total_hourly_rate'] * 1.5
-            overtime_earnings = overtime_rates.sum()
-
-            total_weekly_pay = regular_earnings + overtime_earnings
-        else:
-            regular_hours = hours
-            overtime_hours = 0
-            regular_earnings = total_weekly_pay
-            overtime_earnings = 0.0
-
-        total_earnings += total_weekly_pay
-
-        weekly_data.append({
-            'week': week,
-            'week_start': group['week_start'].iloc[0],
-            'regular_hours': regular_hours,
-            'overtime_hours': overtime_hours,
-            'base_pay': base_pay,
-            'charge_nurse_pay': charge_nurse_pay_total,
-            'night_diff_pay': night_diff_pay_total,
-            'weekend_diff_pay': weekend_diff_pay_total,
-            'on_call_diff_pay': on_call_diff_pay_total,
-            'regular_earnings': regular_earnings,
-            'overtime_earnings': overtime_earnings,
-            'total_weekly_pay': total_weekly_pay
-        })
-
-    return total_earnings, total_hours, weekly_data, df_hours
-
-# Federal tax brackets for 2023
-federal_tax_brackets = {
-    'Single': [
-        (0, 11000, 0.10),
-        (11000, 44725, 0.12),
-        (44725, 95375, 0.22),
-        (95375, 182100, 0.24),
-        (182100, 231250, 0.32),
-        (231250, 578125, 0.35),
-        (578125, float('inf'), 0.37)
-    ],
-    'Married Filing Jointly': [
-        (0, 22000, 0.10),
-        (22000, 89450, 0.12),
-        (89450, 190750, 0.22),
-        (190750, 364200, 0.24),
-        (364200, 462500, 0.32),
-        (462500, 693750, 0.35),
-        (693750, float('inf'), 0.37)
-    ],
-    'Head of Household': [
-        (0, 15700, 0.10),
-        (15700, 59850, 0.12),
-        (59850, 95350, 0.22),
-        (95350, 182100, 0.24),
-        (182100, 231250, 0.32),
-        (231250, 578100, 0.35),
-        (578100, float('inf'), 0.37)
-    ]
-}
-
-# Dictionary of state tax rates (approximate highest marginal rates)
-state_tax_rates = {
-    # ... [Same as before]
-    'Alabama': 5.0,
-    'Alaska': 0.0,
-    'Arizona': 4.50,
-    'Arkansas': 5.90,
-    'California': 13.30,
-    'Colorado': 4.55,
-    'Connecticut': 6.99,
-    'Delaware': 6.60,
-    'Florida': 0.0,
-    'Georgia': 5.75,
-    'Hawaii': 11.00,
-    'Idaho': 6.925,
-    'Illinois': 4.95,
-    'Indiana': 3.23,
-    'Iowa': 8.53,
-    'Kansas': 5.70,
-    'Kentucky': 5.0,
-    'Louisiana': 6.0,
-    'Maine': 7.15,
-    'Maryland': 5.75,
-    'Massachusetts': 5.0,
-    'Michigan': 4.25,
-    'Minnesota': 9.85,
-    'Mississippi': 5.0,
-    'Missouri': 5.40,
-    'Montana': 6.90,
-    'Nebraska': 6.84,
-    'Nevada': 0.0,
-    'New Hampshire': 5.0,  # Dividends and interest income only
-    'New Jersey': 10.75,
-    'New Mexico': 5.90,
-    'New York': 8.82,
-    'North Carolina': 5.25,
-    'North Dakota': 2.90,
-    'Ohio': 4.797,
-    'Oklahoma': 5.0,
-    'Oregon': 9.90,
-    'Pennsylvania': 3.07,
-    'Rhode Island': 5.99,
-    'South Carolina': 7.0,
-    'South Dakota': 0.0,
-    'Tennessee': 0.0,
-    'Texas': 0.0,
-    'Utah': 4.95,
-    'Vermont': 8.75,
-    'Virginia': 5.75,
-    'Washington': 0.0,
-    'West Virginia': 6.50,
-    'Wisconsin': 7.65,
-    'Wyoming': 0.0,
-    'District of Columbia': 8.95
-}
+        st.warning(f"{len(df_flagged)} of {len(df_reconciled)} week/category amounts differ from the pay records.")
+        st.dataframe(df_flagged.drop(columns='flagged').round(2), hide_index=True)
+    st.download_button("Download Reconciliation", df_reconciled.to_csv(index=False), file_name=file_name,
+                       mime="text/csv", key=f"download_{file_name}")
+
+# Aggregated chart frames are cached per weekly result and granularity
+@st.cache_data(max_entries=32)
+def get_chart_data(weekly_data, granularity):
+    return prepare_chart_data(weekly_data, granularity)
+
+# Hour classification only depends on the schedule and overtime rules, so changing rates reuses it.
+# The schedule is hashed by its fingerprint.
+@st.cache_data(max_entries=16, hash_funcs={WorkPeriodIndex: WorkPeriodIndex.fingerprint})
+def get_hour_classes(work_periods, week_start_day, weekly_overtime_hours, daily_overtime_rules, workday_start_hour):
+    return classify_hours(work_periods, week_start_day, weekly_overtime_hours, daily_overtime_rules,
+                          workday_start_hour)
 
 # Streamlit App
 st.set_page_config(page_title="Nurse Differential Calculator 👩‍⚕️")
 
+# Opt-in timing of each stage of this page, shown in the sidebar
+profiler = StageTimer(enabled=st.sidebar.checkbox("Show Performance Panel"))
+
+# Optional saved schedule: work periods are kept in a local SQLite database per profile,
+# and only the shifts in the chosen date range are loaded into the session
+schedule_store = None
+with st.sidebar:
+    if st.checkbox("Keep My Schedule Between Sessions"):
+        # There is no shared default profile, so one person's shifts never end up in another's
+        schedule_profile = st.text_input("Profile", placeholder="e.g. your name").strip()
+        schedule_range = st.date_input(
+            "Load Shifts Between", value=(date.today() - timedelta(days=90), date.today() + timedelta(days=90))
+        )
+        if not schedule_profile:
+            st.info("Enter a profile name to save and load your schedule.")
+        elif len(schedule_range) == 2:
+            schedule_store = get_schedule_store()
+
 # Work Periods State Management
 if 'work_periods' not in st.session_state:
-    st.session_state.work_periods = []
+    st.session_state.work_periods = WorkPeriodIndex()
+if 'ics_seen_events' not in st.session_state:
+    st.session_state.ics_seen_events = {}
+if 'schedule_loaded' not in st.session_state:
+    st.session_state.schedule_loaded = None
+
+if schedule_store is None:
+    st.session_state.schedule_loaded = None
+else:
+    range_start = datetime.combine(schedule_range[0], time.min)
+    range_end = datetime.combine(schedule_range[1] + timedelta(days=1), time.min)
+    schedule_key = (schedule_profile, range_start, range_end)
+    if st.session_state.schedule_loaded != schedule_key:
+        with profiler.stage("schedule_load") as record:
+            # Shifts entered before the saved schedule was turned on are saved first
+            if st.session_state.schedule_loaded is None:
+                schedule_store.add_periods(schedule_profile, st.session_state.work_periods)
+            st.session_state.work_periods = WorkPeriodIndex(
+                schedule_store.load_periods(schedule_profile, range_start, range_end)
+            )
+            record['rows'] = len(st.session_state.work_periods)
+        st.session_state.schedule_loaded = schedule_key
 
 # Input: Upload .ics file
 st.subheader("Upload Your Work Schedule (.ics File)")
 uploaded_file = st.file_uploader("Choose an .ics file", type="ics")
+on_call_keyword = st.text_input("On-Call Events Contain", value=DEFAULT_ON_CALL_KEYWORD)
 
 if uploaded_file is not None:
     try:
-        # Read and parse the .ics file
-        gcal = Calendar.from_ical(uploaded_file.read())
-        imported_periods = []
-        for component in gcal.walk():
-            if component.name == "VEVENT":
-                summary = str(component.get('summary'))
-                # Determine if this event is a work period based on summary or other criteria
-                # For this example, we'll assume all events are work periods
-                # You can add conditions to filter events as needed
-                start = component.get('dtstart').dt
-                end = component.get('dtend').dt
-
-                # Ensure start and end are datetime objects
-                if isinstance(start, date) and not isinstance(start, datetime):
-                    start = datetime.combine(start, datetime.min.time())
-                if isinstance(end, date) and not isinstance(end, datetime):
-                    end = datetime.combine(end, datetime.min.time())
-
-                # Check for all-day events
-                if start == end:
-                    end += timedelta(days=1)
-
-                # For on-call determination, check if summary contains 'On Call' (adjust as needed)
-                is_on_call = 'on call' in summary.lower()
-
-                # Check for overlapping shifts
-                if not check_overlap(start, end, st.session_state.work_periods):
-                    st.session_state.work_periods.append((start, end, is_on_call))
-                    imported_periods.append((start, end, is_on_call))
+        with profiler.stage("ics_import", get_ics_cache()) as record:
+            # Parse the file (or reuse an earlier parse of the same bytes), skipping events
+            # imported before
+            parsed_periods = load_ics_work_periods(
+                uploaded_file.getvalue(), st.session_state.ics_seen_events, on_call_keyword or DEFAULT_ON_CALL_KEYWORD,
+                cache=get_ics_cache()
+            )
+
+            # Add all events in one sorted pass, skipping overlapping shifts
+            imported_periods = st.session_state.work_periods.bulk_insert(parsed_periods)
+            if schedule_store is not None:
+                schedule_store.add_periods(schedule_profile, imported_periods)
+            record['rows'] = len(imported_periods)
         st.success(f"Imported {len(imported_periods)} work periods from the .ics file.")
     except Exception as e:
         st.error(f"An error occurred while processing the .ics file: {e}")
@@ -339,8 +204,10 @@ if end_datetime <= start_datetime:
     validation_errors.append("End date and time must be after the start date and time.")
 
 # Check for overlapping shifts
-if check_overlap(start_datetime, end_datetime, st.session_state.work_periods):
-    validation_errors.append("This shift overlaps with an existing shift.")
+with profiler.stage("overlap_check") as record:
+    record['rows'] = len(st.session_state.work_periods)
+    if st.session_state.work_periods.overlaps(start_datetime, end_datetime):
+        validation_errors.append("This shift overlaps with an existing shift.")
 
 # Display validation errors
 if validation_errors:
@@ -356,33 +223,156 @@ else:
     st.info(f"Shift to be added: {formatted_shift}")
 
 if st.button("Add Work Period", disabled=bool(validation_errors)):
-    st.session_state.work_periods.append((start_datetime, end_datetime, is_on_call))
+    st.session_state.work_periods.insert((start_datetime, end_datetime, is_on_call))
+    if schedule_store is not None:
+        schedule_store.add_periods(schedule_profile, [(start_datetime, end_datetime, is_on_call)])
     st.success(f"Work period added successfully: {formatted_shift}")
 
-# Display work periods with delete buttons
-if st.session_state.work_periods:
-    st.markdown("<h2 style='text-align: center; color: green;'>Work Periods:</h2>", unsafe_allow_html=True)
-    for i, (start, end, is_on_call) in enumerate(st.session_state.work_periods):
-        shift_type = determine_shift_differential(start.hour)
-        formatted_shift = (
-            f"{start.strftime('%B %d')} to {end.strftime('%B %d')}, {shift_type} from "
-            f"{start.strftime('%I:%M %p').lower()} to {end.strftime('%I:%M %p').lower()}"
-        )
-        col1, col2 = st.columns([0.9, 0.1])
+# Work period table: one page of the shifts in a date range is shown in an editor, and ticked
+# deletions and edits are applied together in one update. Only the page's rows are built, so a
+# rerun costs the same however many shifts are stored.
+work_period_page_sizes = [25, 50, 100, 250]
+
+if 'work_period_table_version' not in st.session_state:
+    st.session_state.work_period_table_version = 0
+
+with profiler.stage("work_period_list") as record:
+    if st.session_state.work_periods:
+        st.markdown("<h2 style='text-align: center; color: green;'>Work Periods:</h2>", unsafe_allow_html=True)
+        for message in st.session_state.pop('work_period_messages', []):
+            st.info(message)
+
+        col1, col2 = st.columns([0.7, 0.3])
         with col1:
-            st.markdown(
-                f"<div style='border: 1px solid #ccc; padding: 10px; font-size: 1.2em; "
-                f"border-radius: 10px; margin-bottom: 10px;'>{formatted_shift}</div>",
-                unsafe_allow_html=True,
+            table_range = st.date_input(
+                "Show Shifts Between",
+                value=(st.session_state.work_periods[0][0].date(), st.session_state.work_periods[-1][0].date()),
             )
         with col2:
-            if st.button("🗑️", key=f"delete_{start}_{end}"):
-                st.session_state.work_periods.pop(i)
-                st.rerun()
+            page_size = st.selectbox("Shifts per Page", work_period_page_sizes, index=1)
+        table_start = datetime.combine(table_range[0], time.min) if len(table_range) > 0 else None
+        table_end = datetime.combine(table_range[-1] + timedelta(days=1), time.min) if len(table_range) > 1 else None
+        first_row, last_row = st.session_state.work_periods.span(table_start, table_end)
+        page_count = max(1, -(-(last_row - first_row) // page_size))
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1) if page_count > 1 else 1
+
+        page_start = first_row + (page - 1) * page_size
+        df_page = work_period_table(st.session_state.work_periods, page_start, min(page_start + page_size, last_row))
+        record['rows'] = len(df_page)
+        df_edited = st.data_editor(
+            df_page, hide_index=True, disabled=['shift'], use_container_width=True,
+            key=f"work_period_table_{st.session_state.work_period_table_version}",
+            column_config={
+                'delete': st.column_config.CheckboxColumn("Delete"),
+                'start': st.column_config.DatetimeColumn("Start", format="MMM D, YYYY h:mm a", step=60, required=True),
+                'end': st.column_config.DatetimeColumn("End", format="MMM D, YYYY h:mm a", step=60, required=True),
+                'on_call': st.column_config.CheckboxColumn("On Call"),
+                'shift': st.column_config.TextColumn("Shift"),
+            },
+        )
+        st.caption(f"{last_row - first_row} shifts in range, {len(st.session_state.work_periods)} in total.")
+
+        deleted, edited = work_period_changes(df_page, df_edited)
+        if st.button(f"Apply Changes ({len(deleted)} deleted, {len(edited)} edited)", disabled=not (deleted or edited)):
+            removed, added, rejected = apply_period_changes(st.session_state.work_periods, deleted, edited)
+            if schedule_store is not None:
+                schedule_store.remove_periods(schedule_profile, [(start, end) for start, end, _ in removed])
+                schedule_store.add_periods(schedule_profile, added)
+            messages = [f"Deleted {len(deleted)} and updated {len(edited) - len(rejected)} work periods."]
+            if rejected:
+                messages.append(f"{len(rejected)} edits were not applied because they end before they start "
+                                f"or overlap another shift.")
+            st.session_state.work_period_messages = messages
+            st.session_state.work_period_table_version += 1
+            st.rerun()
 
 # Input: hourly rate
 hourly_rate = st.number_input("Hourly Rate ($)", min_value=0.0, value=34.45)
 
+# Overtime rules
+with st.expander("Overtime Rules"):
+    week_start_day = st.selectbox(
+        "Workweek Starts On", range(7), format_func=lambda day: calendar.day_name[day]
+    )
+    workday_start_hour = st.selectbox(
+        "Workdays Start At", range(24), format_func=lambda hour: f"{hour:02d}:00",
+        help="Daily overtime counts the hours worked from this time until the same time the next day, "
+             "and the workweek starts at this time too. Set it to 19:00 to count a 19:00-07:00 night "
+             "shift as one workday."
+    )
+    weekly_overtime_hours = st.number_input("Weekly Overtime After (hours)", min_value=0.0, value=40.0)
+    daily_overtime_rules = []
+    if st.checkbox("Daily Overtime"):
+        daily_overtime_hours = st.number_input("Time and a Half After (hours per day)", min_value=0.0, value=8.0)
+        daily_double_time_hours = st.number_input("Double Time After (hours per day, 0 = none)", min_value=0.0, value=12.0)
+        daily_overtime_rules.append((daily_overtime_hours, 1.5))
+        if daily_double_time_hours > 0:
+            daily_overtime_rules.append((daily_double_time_hours, 2.0))
+
+# Optional rule table replacing the night, weekend and on-call differentials above
+default_rule_rows = pd.DataFrame([
+    {'name': 'night', 'amount': 16.0, 'start_hour': 19.0, 'end_hour': 7.0, 'weekdays': None,
+     'holidays': None, 'on_call': False, 'group': None, 'priority': 0},
+    {'name': 'weekend', 'amount': 5.0, 'start_hour': None, 'end_hour': None, 'weekdays': 'Sat, Sun',
+     'holidays': None, 'on_call': False, 'group': 'premium', 'priority': 1},
+    {'name': 'holiday', 'amount': 50.0, 'start_hour': None, 'end_hour': None, 'weekdays': None,
+     'holidays': 'Only', 'on_call': False, 'group': 'premium', 'priority': 2},
+    {'name': 'on_call', 'amount': 50.0, 'start_hour': None, 'end_hour': None, 'weekdays': None,
+     'holidays': None, 'on_call': True, 'group': None, 'priority': 0},
+])
+
+# Function to turn the rule editor's rows into rule dicts, leaving out empty cells
+def read_rule_rows(df_rules):
+    rules = []
+    for row in df_rules.to_dict('records'):
+        rule = {key: value for key, value in row.items() if value is not None and value == value and value != ''}
+        if not rule.get('name'):
+            continue
+        rule['holidays'] = {'Only': True, 'Never': False}.get(rule.get('holidays'))
+        rule['on_call'] = True if rule.get('on_call') else None
+        rule['priority'] = int(rule.get('priority', 0))
+        rules.append(rule)
+    return rules
+
+with st.expander("Custom Differential Rules"):
+    use_custom_rules = st.checkbox("Use a Custom Rule Table")
+    st.caption(
+        "Amounts follow the Differential Type above. Hours run 0-24 and a window may wrap past midnight; "
+        "weekdays are names such as Fri, Sat. Matching rules stack, except rules in the same group, "
+        "where only the highest priority is paid."
+    )
+    df_rule_rows = st.data_editor(
+        default_rule_rows, num_rows="dynamic", hide_index=True, key="rule_table",
+        column_config={
+            'name': st.column_config.TextColumn("Name"),
+            'amount': st.column_config.NumberColumn("Amount", min_value=0.0),
+            'start_hour': st.column_config.NumberColumn("From Hour", min_value=0.0, max_value=24.0),
+            'end_hour': st.column_config.NumberColumn("To Hour", min_value=0.0, max_value=24.0),
+            'weekdays': st.column_config.TextColumn("Weekdays"),
+            'holidays': st.column_config.SelectboxColumn("Holidays", options=['Only', 'Never']),
+            'on_call': st.column_config.CheckboxColumn("On Call Only"),
+            'group': st.column_config.TextColumn("Group"),
+            'priority': st.column_config.NumberColumn("Priority", step=1),
+        },
+    )
+    use_federal_holidays = st.checkbox("Include US Federal Holidays", value=True)
+    other_holidays = st.text_area("Other Holiday Dates (YYYY-MM-DD, one per line)")
+
+custom_rules = None
+if use_custom_rules:
+    if st.session_state.work_periods:
+        rule_years = range(st.session_state.work_periods[0][0].year, st.session_state.work_periods[-1][1].year + 1)
+    else:
+        rule_years = [date.today().year]
+    try:
+        custom_rules = rule_table_from_config({
+            'rules': read_rule_rows(df_rule_rows),
+            'holidays': other_holidays.split(),
+            'federal_holidays': use_federal_holidays,
+        }, years=rule_years)
+    except (TypeError, ValueError) as e:
+        st.error(f"Invalid differential rules: {e}")
+
 # Tax Information
 st.subheader("Tax Information")
 
@@ -397,45 +387,290 @@ state_tax_rate = state_tax_rates[selected_state]
 
 st.write(f"State Tax Rate for {selected_state}: {state_tax_rate}%")
 
-# Calculate earnings
+# What-if sweep: price a grid of rate combinations against the current schedule at once
+sweep_labels = {
+    'hourly_rate': 'Hourly Rate ($)',
+    'charge_nurse_pay': 'Charge Nurse Pay ($)',
+    'night_differential': 'Night Shift Differential',
+    'weekend_differential': 'Weekend Differential',
+    'on_call_differential': 'On-Call Differential',
+}
+current_rates = {
+    'hourly_rate': hourly_rate,
+    'charge_nurse_pay': charge_nurse_pay,
+    'night_differential': night_differential,
+    'weekend_differential': weekend_differential,
+    'on_call_differential': on_call_differential,
+}
+
+st.subheader("What-If Rate Sweep")
+with st.expander("Compare Rate Combinations"):
+    if not st.session_state.work_periods:
+        st.write("Add work periods to compare rates for your schedule.")
+    else:
+        if custom_rules is not None:
+            st.caption("The sweep prices the built-in night, weekend and on-call differentials, not the custom rule table.")
+        sweep_ranges = {}
+        for column, axis in zip(st.columns(2), ["Across", "Down"]):
+            with column:
+                options = [name for name in sweep_labels if name not in sweep_ranges]
+                name = st.selectbox(f"Vary {axis}", options, format_func=sweep_labels.get, key=f"sweep_{axis}")
+                current = current_rates[name]
+                low = st.number_input("From", min_value=0.0, value=round(current * 0.8, 2), key=f"sweep_low_{axis}_{name}")
+                high = st.number_input("To", min_value=0.0, value=round(current * 1.2, 2) or 10.0, key=f"sweep_high_{axis}_{name}")
+                steps = st.number_input("Steps", min_value=2, max_value=50, value=15, key=f"sweep_steps_{axis}")
+                sweep_ranges[name] = np.round(np.linspace(low, high, steps), 2)
+
+        with profiler.stage("rate_sweep") as record:
+            df_classes = get_hour_classes(
+                st.session_state.work_periods, week_start_day, weekly_overtime_hours, tuple(daily_overtime_rules),
+                workday_start_hour
+            )
+            rate_grid = build_rate_grid(**{**current_rates, **sweep_ranges})
+            df_sweep, _ = sweep_rates(df_classes, rate_grid, differential_type)
+            record['rows'] = len(df_sweep)
+
+        x_name, y_name = sweep_ranges
+        heatmap = alt.Chart(df_sweep).mark_rect().encode(
+            x=alt.X(f'{x_name}:O', title=sweep_labels[x_name]),
+            y=alt.Y(f'{y_name}:O', title=sweep_labels[y_name], sort='descending'),
+            color=alt.Color('total_earnings:Q', title='Pre-Tax Earnings ($)'),
+            tooltip=[x_name, y_name, alt.Tooltip('total_earnings:Q', format='$,.2f')]
+        )
+        st.altair_chart(heatmap, use_container_width=True)
+        st.dataframe(df_sweep[[x_name, y_name, 'total_earnings']].round(2), hide_index=True)
+
+# Projection: estimate earnings for a recurring rotation before the shifts are scheduled
+rotation_weekdays = [MO, TU, WE, TH, FR, SA, SU]
+projection_months = {'Month': 1, 'Quarter': 3, 'Year': 12}
+
+st.subheader("Project Earnings for a Rotation")
+with st.expander("Describe Your Rotation"):
+    col1, col2 = st.columns(2)
+    with col1:
+        rotation_start_date = st.date_input("Rotation Start Date")
+        rotation_start_time = st.time_input("Shift Start Time", value=time(19, 0))
+        rotation_shift_hours = st.number_input("Shift Length (hours)", min_value=0.5, max_value=24.0, value=12.0)
+    with col2:
+        rotation_days = st.multiselect(
+            "Shift Days", list(range(7)), default=[2, 3, 4], format_func=lambda day: calendar.day_name[day]
+        )
+        rotation_interval = st.number_input("Repeat Every (weeks)", min_value=1, value=1)
+        projection_length = st.selectbox("Project For", list(projection_months))
+    every_other_weekend = st.checkbox("Plus Every Other Weekend (Saturday and Sunday)")
+
+    if st.button("Project Earnings", disabled=not (rotation_days or every_other_weekend)):
+        rotation_start = datetime.combine(rotation_start_date, rotation_start_time)
+        rotation_end = rotation_start + relativedelta(months=projection_months[projection_length])
+        shift_rules = []
+        if rotation_days:
+            shift_rules.append(rrule(WEEKLY, interval=rotation_interval, dtstart=rotation_start,
+                                     byweekday=[rotation_weekdays[day] for day in rotation_days]))
+        if every_other_weekend:
+            shift_rules.append(rrule(WEEKLY, interval=2, byweekday=(SA, SU), dtstart=rotation_start))
+
+        # Shifts are generated lazily and priced one workweek at a time
+        projected_periods = iter_rotation_periods(shift_rules, rotation_shift_hours, rotation_end)
+        projected_earnings, projected_hours, projected_weeks, _ = calculate_total_earnings(
+            projected_periods, hourly_rate, charge_nurse_pay,
+            night_differential, weekend_differential, on_call_differential, differential_type,
+            week_start_day, weekly_overtime_hours, daily_overtime_rules, workday_start_hour,
+            week_cache=get_week_cache(), rules=custom_rules
+        )
+        st.success(f"Projected hours for the {projection_length.lower()}: {round(projected_hours, 2):g} hours")
+        st.success(f"Projected pre-tax earnings for the {projection_length.lower()}: ${projected_earnings:.2f}")
+        if projected_weeks:
+            st.dataframe(
+                pd.DataFrame(projected_weeks)[['week', 'regular_hours', 'overtime_hours', 'total_weekly_pay']],
+                hide_index=True,
+            )
+
+# Rates and overtime rules of the earnings runs below
+earnings_rates = (hourly_rate, charge_nurse_pay, night_differential, weekend_differential,
+                  on_call_differential, differential_type)
+earnings_overtime_rules = (week_start_day, weekly_overtime_hours, tuple(daily_overtime_rules), workday_start_hour)
+
+# Unit schedules: every staff member's .ics export (one file per person, or zips of them) is
+# parsed and priced in the shared process pool at the rates above
+st.subheader("Unit Labor Cost")
+with st.expander("Load Your Unit's Schedules"):
+    unit_files = st.file_uploader(
+        "Choose .ics files or .zip archives (one .ics file per person, named after them)",
+        type=["ics", "zip"], accept_multiple_files=True, key="unit_files"
+    )
+    unit_pay_file = st.file_uploader(
+        "Pay Records to Reconcile (optional; .csv, .parquet or .arrow with person, date, code, amount and hours)",
+        type=["csv", "parquet", "arrow"], key="unit_pay_file"
+    )
+    unit_pay_tolerance = st.number_input("Flag Differences Over ($)", min_value=0.0, value=0.01, step=0.01,
+                                         key="unit_pay_tolerance")
+    if st.button("Calculate Unit Earnings", disabled=not unit_files):
+        process_pool = get_process_pool()
+        try:
+            with profiler.stage("unit_import", get_ics_cache()) as record:
+                unit_schedules, unit_report = import_unit_schedules(
+                    [(unit_file.name, unit_file.getvalue()) for unit_file in unit_files], process_pool,
+                    on_call_keyword=on_call_keyword or DEFAULT_ON_CALL_KEYWORD, cache=get_ics_cache()
+                )
+                record['rows'] = sum(len(schedule) for schedule in unit_schedules.values())
+            with profiler.stage("unit_earnings") as record:
+                unit_results, unit_total = calculate_unit_earnings(
+                    unit_schedules, earnings_rates, earnings_overtime_rules, rules=custom_rules,
+                    executor=process_pool
+                )
+                record['rows'] = len(unit_results)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for using too much memory), which breaks the pool for every
+            # session; shut it down and drop it from the cache so the next import starts a new one
+            process_pool.shutdown(wait=False, cancel_futures=True)
+            get_process_pool.clear()
+            st.error("A worker process stopped while importing the unit's schedules. Please try again.")
+        else:
+            unit_errors = [entry for entry in unit_report if entry['error']]
+            for entry in unit_errors:
+                st.error(f"Could not read {entry['file']}: {entry['error']}")
+            st.dataframe(
+                pd.DataFrame(unit_report, columns=['file', 'person', 'work_periods', 'error']), hide_index=True
+            )
+            if unit_results:
+                st.dataframe(
+                    pd.DataFrame(unit_results)[['person', 'work_periods', 'total_hours',
+                                                'total_earnings']].round(2),
+                    hide_index=True,
+                )
+                st.success(f"Unit total: {unit_total['people']} people, "
+                           f"{round(unit_total['total_hours'], 2):g} hours, "
+                           f"${unit_total['total_earnings']:,.2f} pre-tax")
+                if unit_pay_file is not None:
+                    try:
+                        with profiler.stage("unit_reconcile") as record:
+                            df_unit_records = read_pay_records(unit_pay_file, unit_pay_file.name)
+                            if 'person' not in df_unit_records:
+                                raise ValueError(
+                                    "Unit pay records need a person column matching the .ics file names"
+                                )
+                            df_expected = pd.concat([result['expected_pay'] for result in unit_results],
+                                                    ignore_index=True)
+                            df_actual = actual_pay_breakdown(
+                                df_unit_records, week_start_day, workday_start_hour,
+                                categories=df_expected['category'].unique()
+                            )
+                            df_unit_reconciled = reconcile_pay(df_expected, df_actual, unit_pay_tolerance)
+                            record['rows'] = len(df_actual)
+                        show_reconciliation(df_unit_reconciled, "unit_reconciliation.csv")
+                    except (KeyError, ValueError) as e:
+                        st.error(f"Could not reconcile the pay records: {e}")
+            else:
+                st.warning("No work periods found in the uploaded files.")
+
+chart_granularity = st.selectbox("Chart Granularity", ['Auto'] + list(chart_granularities))
+export_format = st.selectbox("Export Format", list(export_formats))
+
+# Inputs of an earnings run; a run whose inputs no longer match the page is stale
+earnings_key = (st.session_state.work_periods.fingerprint(), earnings_rates, earnings_overtime_rules, custom_rules)
+
+# A run is cancelled as soon as any of its inputs change
+earnings_job = st.session_state.get('earnings_job')
+if earnings_job is not None and earnings_job.key != earnings_key:
+    earnings_job.cancel()
+    earnings_job = st.session_state.earnings_job = None
+
+# Calculate earnings in the shared worker pool, so a long schedule doesn't block this script
 if st.button("Calculate Earnings"):
     if not st.session_state.work_periods:
         st.error("Please add at least one work period before calculating earnings.")
     else:
-        total_earnings, total_hours, weekly_data, df_hours = calculate_total_earnings(
-            st.session_state.work_periods, hourly_rate, charge_nurse_pay,
-            night_differential, weekend_differential, on_call_differential, differential_type
+        if earnings_job is not None:
+            earnings_job.cancel()
+        earnings_job = st.session_state.earnings_job = EarningsJob(
+            get_worker_pool(), earnings_key, WorkPeriodIndex(st.session_state.work_periods),
+            earnings_rates, earnings_overtime_rules, week_cache=get_week_cache(), rules=custom_rules
+        )
+        # Weeks saved with the schedule from an earlier run, with the same shifts and rates, are
+        # shown while the run is going; the run's own weeks are saved once it is done
+        st.session_state.saved_week_digests = {}
+        st.session_state.saved_weeks = []
+        if schedule_store is not None:
+            with profiler.stage("saved_weeks_load") as record:
+                st.session_state.saved_week_digests = week_digests(
+                    st.session_state.work_periods, earnings_rates, earnings_overtime_rules, custom_rules
+                )
+                st.session_state.saved_weeks = schedule_store.load_weekly_summaries(
+                    schedule_profile, st.session_state.saved_week_digests
+                )
+                record['rows'] = len(st.session_state.saved_weeks)
+        # Short runs finish here, without flashing the progress bar
+        earnings_job.wait(0.5)
+
+# Shows the progress of a run and the weeks finished so far, along with the saved weeks it
+# hasn't reached yet, polling until it is done
+@st.fragment(run_every=0.5)
+def show_earnings_progress(job, saved_weeks):
+    if job.done():
+        st.rerun()
+    st.progress(job.progress, text="Calculating earnings...")
+    if st.button("Cancel Calculation"):
+        job.cancel()
+        st.rerun()
+    finished_weeks = {week['week']: week for week in saved_weeks}
+    finished_weeks.update((week['week'], week) for week in job.partial_weeks())
+    if finished_weeks:
+        st.dataframe(
+            pd.DataFrame([finished_weeks[week] for week in sorted(finished_weeks)])[
+                ['week', 'regular_hours', 'overtime_hours', 'total_weekly_pay']
+            ],
+            hide_index=True,
         )
 
-        # Get the appropriate federal tax brackets based on filing status
-        tax_brackets = federal_tax_brackets[selected_filing_status]
-
-        # Calculate federal tax
-        federal_tax_amount = calculate_federal_tax(total_earnings, tax_brackets)
-
-        # Calculate state tax
-        state_tax_rate_decimal = state_tax_rate / 100.0
-        state_tax_amount = total_earnings * state_tax_rate_decimal
+if earnings_job is not None and not earnings_job.done():
+    show_earnings_progress(earnings_job, st.session_state.get('saved_weeks', []))
+elif earnings_job is not None and earnings_job.cancelled():
+    st.info("Calculation cancelled.")
+    earnings_job = st.session_state.earnings_job = None
+elif earnings_job is not None:
+    total_earnings, total_hours, weekly_data, df_hours = earnings_job.result()
+
+    # The first time a run's results are shown, record its timing and save its weeks with the
+    # saved schedule
+    if not earnings_job.shown:
+        earnings_job.shown = True
+        profiler.add_stage("calculate_earnings", earnings_job.seconds, rows=len(df_hours),
+                           cache_hits=earnings_job.cache_hits, cache_misses=earnings_job.cache_misses)
+        if schedule_store is not None:
+            schedule_store.save_weekly_summaries(schedule_profile, weekly_data,
+                                                 st.session_state.get('saved_week_digests', {}))
+
+    # The period covers every workweek from the first to the last one worked
+    weeks_in_period = (weekly_data[-1]['week_start'] - weekly_data[0]['week_start']).days // 7 + 1
+    periods_per_year = 52 / weeks_in_period
+
+    # Calculate federal and state tax, annualizing the period's earnings
+    with profiler.stage("tax"):
+        federal_tax_amount, state_tax_amount = calculate_period_tax(
+            total_earnings, periods_per_year, get_federal_tax_table(selected_filing_status), state_tax_rate
+        )
 
-        # Total tax amount
-        total_tax_amount = federal_tax_amount + state_tax_amount
+    # Total tax amount
+    total_tax_amount = federal_tax_amount + state_tax_amount
 
-        post_tax_earnings = total_earnings - total_tax_amount
+    post_tax_earnings = total_earnings - total_tax_amount
 
-        st.success(f"Total hours worked: {total_hours} hours")
-        st.success(f"Total pre-tax earnings for the period: ${total_earnings:.2f}")
-        st.success(f"Federal tax amount ({selected_filing_status}): ${federal_tax_amount:.2f}")
-        st.success(f"State tax amount ({selected_state}): ${state_tax_amount:.2f}")
-        st.success(f"Total tax amount: ${total_tax_amount:.2f}")
-        st.success(f"Total post-tax earnings for the period: ${post_tax_earnings:.2f}")
+    st.success(f"Total hours worked: {round(total_hours, 2):g} hours")
+    st.success(f"Total pre-tax earnings for the period: ${total_earnings:.2f}")
+    st.success(f"Federal tax amount ({selected_filing_status}, {weeks_in_period} week period): ${federal_tax_amount:.2f}")
+    st.success(f"State tax amount ({selected_state}): ${state_tax_amount:.2f}")
+    st.success(f"Total tax amount: ${total_tax_amount:.2f}")
+    st.success(f"Total post-tax earnings for the period: ${post_tax_earnings:.2f}")
 
+    with profiler.stage("weekly_breakdown") as record:
+        record['rows'] = len(weekly_data)
         st.subheader("Weekly Earnings Breakdown")
         for data in weekly_data:
             week_end = data['week_start'] + timedelta(days=6)
             week_range = f"{data['week_start'].strftime('%b %d')} - {week_end.strftime('%b %d')}"
             st.markdown(f"**Week of {week_range}:**")
-            st.markdown(f"- Regular Hours: {data['regular_hours']} hours")
-            st.markdown(f"- Overtime Hours: {data['overtime_hours']} hours")
+            st.markdown(f"- Regular Hours: {round(data['regular_hours'], 2):g} hours")
+            st.markdown(f"- Overtime Hours: {round(data['overtime_hours'], 2):g} hours")
             st.markdown(f"- Base Pay: ${data['base_pay']:.2f}")
             if data['charge_nurse_pay'] > 0:
                 st.markdown(f"- Charge Nurse Pay: ${data['charge_nurse_pay']:.2f}")
@@ -445,42 +680,75 @@ if st.button("Calculate Earnings"):
                 st.markdown(f"- Weekend Differential Pay: ${data['weekend_diff_pay']:.2f}")
             if data['on_call_diff_pay'] > 0:
                 st.markdown(f"- On-Call Differential Pay: ${data['on_call_diff_pay']:.2f}")
+            for column, amount in data.items():
+                if column.endswith('_diff_pay') and column not in earning_type_labels and amount > 0:
+                    st.markdown(f"- {earning_type_label(column)} Pay: ${amount:.2f}")
             st.markdown(f"- Regular Earnings: ${data['regular_earnings']:.2f}")
             st.markdown(f"- Overtime Earnings: ${data['overtime_earnings']:.2f}")
             st.markdown(f"- Total Earnings: ${data['total_weekly_pay']:.2f}")
             st.markdown("---")
 
-        st.info("**Disclaimer:** Tax calculations are estimates and may not reflect your actual tax liability. Please consult a tax professional for accurate information.")
-
-        # Visualization: Bar Chart of Earnings per Week
-        st.subheader("Earnings Breakdown per Week")
+    # Download the hour-level rows and the weekly summary for payroll reconciliation
+    with profiler.stage("export") as record:
+        record['rows'] = len(df_hours) + len(weekly_data)
+        export_suffix, export_mime = export_formats[export_format]
+        export_columns = st.columns(2)
+        export_columns[0].download_button(
+            "Download Hourly Detail", export_bytes(earnings_job.key, 'hours', export_format, df_hours),
+            file_name=f"hourly_detail{export_suffix}", mime=export_mime
+        )
+        export_columns[1].download_button(
+            "Download Weekly Summary", export_bytes(earnings_job.key, 'weeks', export_format, weekly_data),
+            file_name=f"weekly_summary{export_suffix}", mime=export_mime
+        )
 
-        # Prepare data for bar chart
-        df_weekly = pd.DataFrame(weekly_data)
-        df_melted = df_weekly.melt(
-            id_vars=['week'],
-            value_vars=['base_pay', 'charge_nurse_pay', 'night_diff_pay', 'weekend_diff_pay', 'on_call_diff_pay', 'overtime_earnings'],
-            var_name='Earning Type',
-            value_name='Amount'
+    # Compare the expected pay per week and category with actual pay records from paystubs
+    with st.expander("Reconcile With Paystubs"):
+        st.caption(
+            "Upload pay records as .csv, .parquet or .arrow with date, code and amount columns, and hours if "
+            "available. Codes such as REG, OT, NIGHT, WKND, CHG and ON CALL are matched to pay categories; "
+            "other codes are listed as unexpected pay."
         )
+        pay_file = st.file_uploader("Pay Records", type=["csv", "parquet", "arrow"], key="pay_file")
+        pay_tolerance = st.number_input("Flag Differences Over ($)", min_value=0.0, value=0.01, step=0.01)
+        if pay_file is not None:
+            try:
+                with profiler.stage("reconcile") as record:
+                    df_pay_records = read_pay_records(pay_file, pay_file.name)
+                    df_reconciled = reconcile_pay_records(df_pay_records, df_hours, week_start_day, workday_start_hour,
+                                                          pay_tolerance)
+                    record['rows'] = len(df_pay_records)
+                show_reconciliation(df_reconciled, "reconciliation.csv")
+            except (KeyError, ValueError) as e:
+                st.error(f"Could not reconcile the pay records: {e}")
+
+    st.info("**Disclaimer:** Tax calculations are estimates and may not reflect your actual tax liability. Please consult a tax professional for accurate information.")
+
+    # Long histories are summed by month or year so the chart keeps a bounded number of bars
+    auto_granularity = choose_chart_granularity(weekly_data[0]['week_start'], weekly_data[-1]['week_start'])
+    granularity_order = list(chart_granularities)
+    if chart_granularity == 'Auto':
+        granularity = auto_granularity
+    elif granularity_order.index(chart_granularity) < granularity_order.index(auto_granularity):
+        granularity = auto_granularity
+        st.caption(f"Showing earnings per {granularity.lower()}; the schedule spans too many {chart_granularity.lower()}s to chart one bar each.")
+    else:
+        granularity = chart_granularity
 
-        # Map earning types to more readable labels
-        earning_type_labels = {
-            'base_pay': 'Base Pay',
-            'charge_nurse_pay': 'Charge Nurse Pay',
-            'night_diff_pay': 'Night Differential',
-            'weekend_diff_pay': 'Weekend Differential',
-            'on_call_diff_pay': 'On-Call Differential',
-            'overtime_earnings': 'Overtime Pay'
-        }
-        df_melted['Earning Type'] = df_melted['Earning Type'].map(earning_type_labels)
+    # Visualization: Bar Chart of Earnings per Period
+    st.subheader(f"Earnings Breakdown per {granularity}")
+
+    with profiler.stage("chart") as record:
+        # Prepare data for bar chart
+        df_melted = get_chart_data(weekly_data, granularity)
+        record['rows'] = len(df_melted)
 
         # Create the stacked bar chart
         chart = alt.Chart(df_melted).mark_bar().encode(
-            x=alt.X('week:N', title='Week'),
+            x=alt.X('period:N', title=granularity),
             y=alt.Y('Amount:Q', title='Earnings ($)', stack='zero'),
             color=alt.Color('Earning Type:N', legend=alt.Legend(title="Earning Components")),
-            tooltip=['week', 'Earning Type', 'Amount']
+            tooltip=['period', 'Earning Type', 'Amount']
         ).properties(
             width=700,
             height=400
@@ -488,56 +756,38 @@ if st.button("Calculate Earnings"):
 
         st.altair_chart(chart, use_container_width=True)
 
-        # Visualization: Calendar View of Work Periods
-        st.subheader("Work Periods Calendar View")
-
-        # Gather all dates with work periods
-        work_dates = []
-        for start, end, is_on_call in st.session_state.work_periods:
-            current_date = start.date()
-            end_date = end.date()
-            while current_date <= end_date:
-                work_dates.append(current_date)
-                current_date += timedelta(days=1)
-
-        work_dates = list(set(work_dates))  # Remove duplicates
-        work_dates.sort()
-
-        if work_dates:
-            # Generate calendars for all months that have work dates
-            min_date = work_dates[0].replace(day=1)
-            max_date = work_dates[-1].replace(day=1)
-
-            months = []
-            current_month = min_date
-            while current_month <= max_date:
-                months.append(current_month)
-                current_month += relativedelta(months=1)
-
-            # Create HTML calendars
-            calendars_html = ""
-            for month in months:
-                cal = calendar.HTMLCalendar(calendar.SUNDAY)
-                # Corrected line here
-                month_html = cal.formatmonth(month.year, month.month)
-                soup = BeautifulSoup(month_html, 'html.parser')
-
-                # Highlight work dates
-                for day in soup.find_all('td'):
-                    if day.text:
-                        try:
-                            day_number = int(day.text)
-                            date_obj = date(month.year, month.month, day_number)
-                            if date_obj in work_dates:
-                                day['style'] = 'background-color: #90EE90; font-weight: bold;'
-                        except ValueError:
-                            continue  # Skip if day.text is not a number
-
-                # Add month title
-                month_title = f"<h3 style='text-align:center;'>{month.strftime('%B %Y')}</h3>"
-                calendars_html += month_title + str(soup)
+    # Visualization: Calendar View of Work Periods
+    st.subheader("Work Periods Calendar View")
 
+    calendar_shading = st.radio("Shade Days By", ["Hours", "Earnings"], horizontal=True)
+    with profiler.stage("calendar") as record:
+        # Total each worked day; months are rendered straight from these and cached
+        daily_totals = get_daily_totals(df_hours)
+        record['rows'] = len(daily_totals)
+
+        if daily_totals:
             # Display the calendars
-            st.components.v1.html(calendars_html, height=600, scrolling=True)
+            st.components.v1.html(
+                build_calendar_html(daily_totals, calendar_shading.lower()), height=600, scrolling=True
+            )
         else:
             st.write("No work periods to display on the calendar.")
+
+# Performance panel
+if profiler.enabled:
+    with st.sidebar:
+        st.subheader("Performance")
+        st.write(f"Timed stages: {profiler.total_seconds() * 1000:.1f} ms")
+        if profiler.stages:
+            df_stages = pd.DataFrame(profiler.stages)
+            df_stages['ms'] = (df_stages.pop('seconds') * 1000).round(2)
+            st.dataframe(df_stages, hide_index=True)
+        st.write(f"Schedule: {len(st.session_state.work_periods)} work periods, "
+                 f"{st.session_state.work_periods.nbytes:,} bytes")
+        week_cache = get_week_cache()
+        st.write(f"Week cache: {len(week_cache)} entries, {week_cache.hits} hits, {week_cache.misses} misses")
+        ics_cache = get_ics_cache()
+        st.write(f".ics cache: {len(ics_cache)} files, {ics_cache.nbytes:,} bytes, "
+                 f"{ics_cache.hits} hits, {ics_cache.misses} misses")
+        st.download_button("Download Trace (JSON)", profiler.to_json(), file_name="earnings_trace.json",
+                           mime="application/json")
@@ -0,0 +1,20 @@
+# Tests for the caching helpers
+from nurse_wage.cache import LRUCache
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_byte_budget():
+    cache = LRUCache(maxsize=10, maxbytes=10, sizeof=len)
+    cache.put('a', b'12345')
+    cache.put('b', b'123456')
+    assert len(cache) == 1 and cache.nbytes == 6
+    cache.put('c', b'12345678901')
+    assert cache.get('c') is None and cache.nbytes == 6
@@ -0,0 +1,55 @@
+# Tests for the command-line entry point
+import json
+import subprocess
+import sys
+
+import pytest
+
+from nurse_wage.cli import main
+
+schedule = '\r\n'.join([
+    'BEGIN:VCALENDAR', 'VERSION:2.0',
+    'BEGIN:VEVENT', 'UID:day', 'DTSTART:20240101T070000', 'DTEND:20240101T190000', 'SUMMARY:Shift',
+    'RRULE:FREQ=WEEKLY;COUNT=2', 'END:VEVENT',
+    'BEGIN:VEVENT', 'UID:call', 'DTSTART:20240103T190000', 'DTEND:20240104T070000', 'SUMMARY:On Call',
+    'END:VEVENT',
+    'END:VCALENDAR',
+]) + '\r\n'
+
+@pytest.fixture
+def ics_file(tmp_path):
+    path = tmp_path / 'schedule.ics'
+    path.write_text(schedule)
+    return str(path)
+
+def test_json_output(ics_file, capsys):
+    assert main([ics_file, '--hourly-rate', '40', '--differential-type', 'Dollar Amount', '--json']) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result['total_hours'] == 36
+    assert [week['week_start'][:10] for week in result['weeks']] == ['2024-01-01', '2024-01-08']
+    assert result['post_tax_earnings'] == pytest.approx(result['total_earnings'] - result['federal_tax'])
+
+def test_exports_and_reconcile(ics_file, tmp_path, capsys):
+    records = tmp_path / 'paystub.csv'
+    records.write_text('date,code,amount,hours\n2024-01-08,REG,480,12\n')
+    hours_path, weeks_path = tmp_path / 'hours.csv', tmp_path / 'weeks.parquet'
+    assert main([ics_file, '--hourly-rate', '40', '--export-hours', str(hours_path), '--export-weeks',
+                 str(weeks_path), '--reconcile', str(records), '--tolerance', '1']) == 0
+    out = capsys.readouterr().out
+    assert 'Total hours worked: 36 hours' in out
+    # The first week was not paid at all
+    assert 'Week of 2024-01-01 ' in out and 'Week of 2024-01-08 ' not in out.split('Pay records:')[1]
+    assert hours_path.read_text().startswith('start,end,week_start,shift_type')
+    assert weeks_path.stat().st_size > 0
+
+def test_errors(ics_file, tmp_path, capsys):
+    assert main([str(tmp_path / 'missing.ics')]) == 1
+    assert 'Could not read' in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main([ics_file, '--export-weeks', str(tmp_path / 'weeks.xlsx')])
+
+def test_import_leaves_out_the_web_app_and_data_libraries():
+    code = ('import sys, nurse_wage.cli; '
+            'print([m for m in ("streamlit", "pandas", "numpy", "pyarrow") if m in sys.modules])')
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
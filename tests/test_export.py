@@ -0,0 +1,70 @@
+# Tests for columnar exports
+import io
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from nurse_wage.export import export_format_for_path, export_hours, export_weeks
+from nurse_wage.pay import calculate_total_earnings
+
+# Function to price a few weeks of day, night and on-call shifts
+def priced_weeks():
+    work_periods = []
+    for i in range(21):
+        start = datetime(2024, 1, 1) + timedelta(days=i)
+        if i % 7 in (0, 2, 4):
+            work_periods.append((start.replace(hour=7), start.replace(hour=19), False))
+        elif i % 7 == 5:
+            work_periods.append((start.replace(hour=19), start.replace(hour=19) + timedelta(hours=12), True))
+    return calculate_total_earnings(work_periods, 41.37, 1.5, 10.0, 5.0, 20.0, "Percentage")
+
+# Function to read an export back into a DataFrame
+def read_export(data, file_format):
+    if file_format == 'CSV':
+        return pd.read_csv(io.BytesIO(data))
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if file_format == 'Parquet':
+        return pq.read_table(io.BytesIO(data)).to_pandas()
+    return pa.ipc.open_file(pa.BufferReader(data)).read_all().to_pandas()
+
+@pytest.mark.parametrize('file_format', ['Parquet', 'Arrow IPC'])
+def test_hours_use_compact_dtypes(file_format):
+    _, _, _, df_hours = priced_weeks()
+    buffer = io.BytesIO()
+    export_hours(df_hours, buffer, file_format)
+    df = read_export(buffer.getvalue(), file_format)
+    assert len(df) == len(df_hours)
+    assert str(df['shift_type'].dtype) == 'category'
+    assert set(df['shift_type']) == {'Day', 'Night'}
+    assert df['hours'].dtype == 'float32'
+    assert df['pay_cents'].dtype == 'int32'
+    assert df['pay_cents'].tolist() == (df_hours['pay'] * 100).round().astype(int).tolist()
+
+@pytest.mark.parametrize('file_format', ['Parquet', 'Arrow IPC', 'CSV'])
+def test_chunked_export_matches_single_chunk(file_format):
+    _, _, weekly_data, df_hours = priced_weeks()
+    for export, table in ((export_hours, df_hours), (export_weeks, weekly_data)):
+        whole, chunked = io.BytesIO(), io.BytesIO()
+        export(table, whole, file_format)
+        export(table, chunked, file_format, chunk_rows=5)
+        df_whole = read_export(whole.getvalue(), file_format)
+        pd.testing.assert_frame_equal(read_export(chunked.getvalue(), file_format), df_whole)
+        assert len(df_whole) == len(table)
+
+def test_weeks_in_cents():
+    total_earnings, _, weekly_data, _ = priced_weeks()
+    buffer = io.BytesIO()
+    export_weeks(weekly_data, buffer, 'CSV')
+    df = read_export(buffer.getvalue(), 'CSV')
+    assert df['week_start'].tolist() == ['2024-01-01', '2024-01-08', '2024-01-15']
+    assert df['total_weekly_pay_cents'].sum() == pytest.approx(total_earnings * 100, abs=len(df))
+
+def test_format_from_path():
+    assert export_format_for_path('hours.PARQUET') == 'Parquet'
+    assert export_format_for_path('hours.feather') == 'Arrow IPC'
+    assert export_format_for_path('weeks.csv') == 'CSV'
+    with pytest.raises(ValueError):
+        export_format_for_path('weeks.xlsx')
@@ -0,0 +1,111 @@
+# Tests for .ics parsing
+import io
+from datetime import datetime
+
+from nurse_wage.cache import LRUCache
+from nurse_wage.ics import iter_ics_work_periods, load_ics_work_periods, parse_ics_bytes
+
+# Function to build the bytes of an .ics file from VEVENT bodies (lists of property lines)
+def calendar(*events):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0']
+    for event in events:
+        lines += ['BEGIN:VEVENT', *event, 'END:VEVENT']
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(lines) + '\r\n').encode()
+
+weekly_shift = ['UID:weekly', 'DTSTAMP:20240101T000000Z', 'DTSTART:20240101T070000', 'DTEND:20240101T190000',
+                'RRULE:FREQ=WEEKLY;COUNT=4', 'SUMMARY:Shift']
+on_call_shift = ['UID:call', 'DTSTAMP:20240101T000000Z', 'DTSTART:20240110T190000', 'DTEND:20240111T070000',
+                 'SUMMARY:On Call']
+
+def test_recurring_events_and_on_call():
+    data = calendar(weekly_shift, on_call_shift)
+    work_periods = sorted(iter_ics_work_periods(io.BytesIO(data)))
+    assert [start.day for start, _, _ in work_periods] == [1, 8, 10, 15, 22]
+    assert [is_on_call for _, _, is_on_call in work_periods] == [False, False, True, False, False]
+    assert work_periods[2][1] == datetime(2024, 1, 11, 7)
+
+def test_exdate_and_rdate():
+    data = calendar(weekly_shift + ['EXDATE:20240108T070000', 'RDATE:20240103T070000'])
+    work_periods = list(iter_ics_work_periods(io.BytesIO(data)))
+    assert [start.day for start, _, _ in work_periods] == [1, 3, 15, 22]
+
+def test_exdate_time_zones_follow_dtstart():
+    # A UTC EXDATE on a floating event, and a date-only EXDATE on an event with a time zone
+    floating = weekly_shift + ['EXDATE:20240108T070000Z']
+    zoned = ['UID:zoned', 'DTSTAMP:20240101T000000Z', 'DTSTART;TZID=America/New_York:20240102T070000',
+             'DTEND;TZID=America/New_York:20240102T190000', 'RRULE:FREQ=WEEKLY;COUNT=3',
+             'EXDATE;VALUE=DATE:20240109', 'RDATE;VALUE=DATE:20240104', 'SUMMARY:Shift']
+    work_periods = list(iter_ics_work_periods(io.BytesIO(calendar(floating, zoned))))
+    assert sorted((start.day, start.hour) for start, _, _ in work_periods) == [(1, 7), (2, 7), (4, 7), (15, 7),
+                                                                               (16, 7), (22, 7)]
+
+def test_overrides_replace_their_instance():
+    moved = ['UID:weekly', 'DTSTAMP:20240105T000000Z', 'RECURRENCE-ID:20240115T070000', 'DTSTART:20240118T070000',
+             'DTEND:20240118T190000', 'SUMMARY:Shift']
+    cancelled = ['UID:weekly', 'RECURRENCE-ID:20240122T070000', 'DTSTART:20240122T070000',
+                 'DTEND:20240122T190000', 'STATUS:CANCELLED']
+    # Overrides work whether they come before or after the recurring event
+    for data in (calendar(weekly_shift, moved, cancelled), calendar(moved, cancelled, weekly_shift)):
+        work_periods = list(iter_ics_work_periods(io.BytesIO(data)))
+        assert sorted(start.day for start, _, _ in work_periods) == [1, 8, 18]
+
+def test_folded_lines_and_on_call_keyword():
+    data = calendar(['UID:x', 'DTSTART:20240105T070000', 'DTEND:20240105T190000', 'SUMMARY:Extra ',
+                     ' shift (standby)'])
+    [(_, _, is_on_call)] = iter_ics_work_periods(io.BytesIO(data), on_call_keyword='STANDBY')
+    assert is_on_call
+
+def test_all_day_event_lasts_one_day():
+    data = calendar(['UID:x', 'DTSTART;VALUE=DATE:20240105', 'SUMMARY:Shift'])
+    [(start, end, _)] = iter_ics_work_periods(io.BytesIO(data))
+    assert (start, end) == (datetime(2024, 1, 5), datetime(2024, 1, 6))
+
+def test_seen_events_skip_reimported_events():
+    data = calendar(weekly_shift, on_call_shift)
+    seen_events = {}
+    assert len(list(iter_ics_work_periods(io.BytesIO(data), seen_events))) == 5
+    assert list(iter_ics_work_periods(io.BytesIO(data), seen_events)) == []
+
+    # A newer DTSTAMP is imported again
+    updated = calendar([line.replace('20240101T000000Z', '20240102T000000Z') for line in on_call_shift])
+    assert len(list(iter_ics_work_periods(io.BytesIO(updated), seen_events))) == 1
+
+def test_overrides_are_kept_apart_from_their_recurring_event():
+    # The override has the same UID and DTSTAMP as the recurring event
+    moved = ['UID:weekly', 'DTSTAMP:20240101T000000Z', 'RECURRENCE-ID:20240115T070000', 'DTSTART:20240118T070000',
+             'DTEND:20240118T190000', 'SUMMARY:Shift']
+    data = calendar(weekly_shift, moved)
+    streaming_seen, cached_seen = {}, {}
+    streaming = sorted(iter_ics_work_periods(io.BytesIO(data), streaming_seen))
+    assert [start.day for start, _, _ in streaming] == [1, 8, 18, 22]
+    assert list(load_ics_work_periods(data, cached_seen)) == streaming
+    assert streaming_seen == cached_seen == {('weekly', None): '20240101T000000Z',
+                                             ('weekly', '20240115T070000'): '20240101T000000Z'}
+    assert list(iter_ics_work_periods(io.BytesIO(data), streaming_seen)) == []
+
+def test_cached_import_matches_streaming():
+    data = calendar(weekly_shift, on_call_shift, ['DTSTART:20240201T070000', 'DTEND:20240201T190000'])
+    cache = LRUCache(maxbytes=10 ** 6, sizeof=lambda parsed: parsed.nbytes)
+    streaming_seen, cached_seen = {}, {}
+    streaming = sorted(iter_ics_work_periods(io.BytesIO(data), streaming_seen))
+
+    assert list(load_ics_work_periods(data, cached_seen, cache=cache)) == streaming
+    assert cached_seen == streaming_seen
+    # Events without a UID can't be recognized, so only they are imported again
+    assert list(load_ics_work_periods(data, cached_seen, cache=cache)) == [streaming[-1]]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_parse_ics_bytes_records_events():
+    parsed = parse_ics_bytes(calendar(weekly_shift, on_call_shift))
+    assert parsed.uids[parsed.events].tolist() == ['call'] + ['weekly'] * 4
+    assert parsed.recurrence_ids.tolist() == ['', '']
+
+def test_repeated_events_are_deduplicated_alike():
+    # The same event twice in a row; only the first is imported
+    data = calendar(on_call_shift, on_call_shift, weekly_shift)
+    streaming_seen, cached_seen = {}, {}
+    streaming = sorted(iter_ics_work_periods(io.BytesIO(data), streaming_seen))
+    assert len(streaming) == 5
+    assert list(load_ics_work_periods(data, cached_seen)) == streaming
+    assert cached_seen == streaming_seen
@@ -0,0 +1,33 @@
+# Tests for background earnings runs
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from nurse_wage.cache import LRUCache
+from nurse_wage.jobs import EarningsJob, count_weeks
+from nurse_wage.profiling import StageTimer
+from nurse_wage.schedule import WorkPeriodIndex
+
+rates = (40.0, 0.0, 10.0, 5.0, 20.0, "Percentage")
+overtime_rules = (0, 40, (), 0)
+
+def test_count_weeks():
+    # A Sunday night shift crosses into the next week unless weeks start at 19:00
+    work_periods = [(datetime(2024, 1, 7, 19), datetime(2024, 1, 8, 7), False)]
+    assert count_weeks(work_periods) == 2
+    assert count_weeks(work_periods, workday_start_hour=19) == 1
+    assert count_weeks(work_periods + [(datetime(2024, 1, 20, 7), datetime(2024, 1, 20, 19), False)]) == 3
+    assert count_weeks([]) == 0
+
+def test_job_records_week_cache_use():
+    work_periods = WorkPeriodIndex([(datetime(2024, 1, day, 7), datetime(2024, 1, day, 19), False)
+                                    for day in (1, 9, 17)])
+    week_cache = LRUCache()
+    profiler = StageTimer()
+    with ThreadPoolExecutor(1) as executor:
+        for _ in range(2):
+            job = EarningsJob(executor, None, work_periods, rates, overtime_rules, week_cache=week_cache)
+            job.result()
+            profiler.add_stage("calculate_earnings", job.seconds, cache_hits=job.cache_hits,
+                               cache_misses=job.cache_misses)
+    assert [(stage['cache_hits'], stage['cache_misses']) for stage in profiler.stages] == [(0, 3), (3, 0)]
+    assert job.progress == 1.0 and len(job.partial_weeks()) == 3
@@ -0,0 +1,64 @@
+# Tests for the regular and overtime hour split
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from nurse_wage.overtime import apply_overtime
+
+# Function to build one-hour segment rows at a flat rate, starting at the given times
+def hour_rows(starts, rate=10.0):
+    return pd.DataFrame({
+        'datetime': pd.to_datetime(starts),
+        'hours': 1.0,
+        'total_hourly_rate': rate,
+    })
+
+# Function to build hourly rows for consecutive hours from start
+def shift_rows(start, hours, rate=10.0):
+    return hour_rows([start + timedelta(hours=i) for i in range(hours)], rate)
+
+def test_weekly_overtime_after_threshold():
+    starts = [datetime(2024, 1, 1) + timedelta(days=day, hours=7 + hour) for day in range(5) for hour in range(9)]
+    df = apply_overtime(hour_rows(starts), weekly_overtime_hours=40)
+    assert df['regular_hours'].sum() == 40
+    assert df['overtime_hours'].sum() == 5
+    assert df['overtime_paid_hours'].sum() == 7.5
+    # The last hours of the week are the overtime ones
+    assert df['overtime_hours'].iloc[-5:].tolist() == [1.0] * 5
+
+def test_daily_overtime_tiers():
+    df = apply_overtime(shift_rows(datetime(2024, 1, 1, 7), 13), daily_overtime_rules=((8, 1.5), (12, 2.0)))
+    assert df['regular_hours'].sum() == 8
+    assert df['overtime_hours'].sum() == 5
+    # Four hours past 8 at 1.5, one hour past 12 at 2.0
+    assert df['overtime_paid_hours'].sum() == pytest.approx(4 * 1.5 + 2.0)
+    assert df['overtime_earnings'].sum() == pytest.approx(80.0)
+
+def test_daily_overtime_does_not_count_toward_weekly():
+    starts = [datetime(2024, 1, 1) + timedelta(days=day, hours=7 + hour) for day in range(4) for hour in range(12)]
+    df = apply_overtime(hour_rows(starts), daily_overtime_rules=((8, 1.5),))
+    # 32 straight hours stay under 40; the 16 hours past 8 a day are daily overtime only
+    assert df['regular_hours'].sum() == 32
+    assert df['overtime_hours'].sum() == 16
+
+def test_rules_are_sorted_by_threshold():
+    rows = shift_rows(datetime(2024, 1, 1, 7), 13)
+    forward = apply_overtime(rows, daily_overtime_rules=((8, 1.5), (12, 2.0)))
+    backward = apply_overtime(rows, daily_overtime_rules=((12, 2.0), (8, 1.5)))
+    assert forward['overtime_paid_hours'].tolist() == backward['overtime_paid_hours'].tolist()
+
+def test_week_start_day():
+    # Saturday through Monday; with weeks starting on Sunday, Saturday is in the week before
+    df = apply_overtime(hour_rows(['2024-01-06 07:00', '2024-01-07 07:00', '2024-01-08 07:00']), week_start_day=6)
+    assert df['week'].tolist() == ['2023-12-31', '2024-01-07', '2024-01-07']
+
+def test_workday_start_hour_keeps_night_shift_in_one_workday():
+    rows = shift_rows(datetime(2024, 1, 2, 20), 12)
+    by_calendar_day = apply_overtime(rows, daily_overtime_rules=((8, 1.5),))
+    assert by_calendar_day['overtime_hours'].sum() == 0
+
+    by_workday = apply_overtime(rows, daily_overtime_rules=((8, 1.5),), workday_start_hour=19)
+    assert by_workday['regular_hours'].sum() == 8
+    assert by_workday['overtime_hours'].sum() == 4
+    assert by_workday['week'].nunique() == 1
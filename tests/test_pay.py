@@ -0,0 +1,113 @@
+# Tests for the segment-based pay engine
+from datetime import datetime, timedelta
+
+import pytest
+
+from nurse_wage.cache import LRUCache
+from nurse_wage.pay import calculate_total_earnings
+from nurse_wage.schedule import WorkPeriodIndex
+
+rates = (40.0, 2.0, 10.0, 5.0, 20.0, "Percentage")
+
+# Function to price work periods the way the original page did: one row per whole hour,
+# workweeks starting on Monday, and the first 40 hours of each week (in order) paid as regular
+# time and the rest at 1.5 times the hour's total rate. Returns week start -> (hours, pay).
+def baseline_weekly_pay(work_periods, hourly_rate, charge_nurse_pay, night_differential,
+                        weekend_differential, on_call_differential, differential_type):
+    weeks = {}
+    for start_time, end_time, is_on_call in work_periods:
+        current_time = start_time
+        while current_time < end_time:
+            week_start = (current_time - timedelta(days=current_time.weekday())).replace(hour=0, minute=0)
+            rate = hourly_rate + charge_nurse_pay
+            amounts = []
+            if current_time.hour >= 19 or current_time.hour < 7:
+                amounts.append(night_differential)
+            if current_time.weekday() >= 5:
+                amounts.append(weekend_differential)
+            if is_on_call:
+                amounts.append(on_call_differential)
+            for amount in amounts:
+                rate += hourly_rate * amount / 100 if differential_type == "Percentage" else amount
+            weeks.setdefault(week_start, []).append(rate)
+            current_time += timedelta(hours=1)
+    return {week_start: (len(hour_rates), sum(hour_rates[:40]) + 1.5 * sum(hour_rates[40:]))
+            for week_start, hour_rates in weeks.items()}
+
+# Function to build a rotation of whole-hour shifts: days, nights and on-call shifts, with
+# some weeks over 40 hours
+def rotation(weeks=8):
+    work_periods = []
+    day = datetime(2024, 1, 1)
+    for i in range(weeks * 7):
+        start = day + timedelta(days=i)
+        if i % 7 in (0, 1, 2):
+            work_periods.append((start.replace(hour=7), start.replace(hour=19), False))
+        elif i % 7 == 4:
+            work_periods.append((start.replace(hour=19), start.replace(hour=19) + timedelta(hours=12), False))
+        elif i % 7 == 5 and i % 2:
+            work_periods.append((start.replace(hour=8), start.replace(hour=16), True))
+    return work_periods
+
+@pytest.mark.parametrize('differential_type', ["Percentage", "Dollar Amount"])
+def test_matches_baseline_hour_by_hour_totals(differential_type):
+    work_periods = rotation()
+    shift_rates = rates[:5] + (differential_type,)
+    baseline = baseline_weekly_pay(work_periods, *shift_rates)
+
+    total_earnings, total_hours, weekly_data, _ = calculate_total_earnings(WorkPeriodIndex(work_periods),
+                                                                            *shift_rates)
+
+    assert {week['week_start'].to_pydatetime(): (week['regular_hours'] + week['overtime_hours'],
+                                                 week['total_weekly_pay'])
+            for week in weekly_data} == pytest.approx(baseline)
+    assert total_hours == sum(hours for hours, _ in baseline.values())
+    assert total_earnings == pytest.approx(sum(pay for _, pay in baseline.values()))
+
+def test_generator_input_matches_index():
+    work_periods = rotation()
+    expected = calculate_total_earnings(WorkPeriodIndex(work_periods), *rates)
+    total_earnings, total_hours, _, _ = calculate_total_earnings(iter(work_periods), *rates)
+    assert total_earnings == pytest.approx(expected[0])
+    assert total_hours == expected[1]
+
+def test_week_cache_reuses_weeks():
+    work_periods = WorkPeriodIndex(rotation(4))
+    week_cache = LRUCache()
+    first = calculate_total_earnings(work_periods, *rates, week_cache=week_cache)
+    assert week_cache.misses == 4 and week_cache.hits == 0
+
+    second = calculate_total_earnings(work_periods, *rates, week_cache=week_cache)
+    assert week_cache.hits == 4
+    assert second[0] == pytest.approx(first[0])
+    assert len(second[3]) == len(first[3])
+
+def test_partial_hours_are_paid_to_the_minute():
+    work_periods = [(datetime(2024, 1, 2, 6, 30), datetime(2024, 1, 2, 7, 15), False)]
+    total_earnings, total_hours, _, df_hours = calculate_total_earnings(work_periods, 40.0, 0.0, 10.0, 0.0, 0.0,
+                                                                        "Dollar Amount")
+    # 30 minutes of night time, then 15 minutes of day time
+    assert total_hours == pytest.approx(0.75)
+    assert total_earnings == pytest.approx(0.5 * 50.0 + 0.25 * 40.0)
+    assert df_hours['is_night'].tolist() == [True, False]
+
+def test_weeks_start_on_week_start_day():
+    # A Saturday to Tuesday stretch of 12 hour shifts
+    work_periods = [(datetime(2024, 1, 6 + i, 7), datetime(2024, 1, 6 + i, 19), False) for i in range(4)]
+    _, _, weekly_data, _ = calculate_total_earnings(work_periods, *rates, week_start_day=6)
+    assert [week['week_start'].day for week in weekly_data] == [31, 7]
+    assert [week['regular_hours'] for week in weekly_data] == [12, 36]
+
+def test_workday_start_hour_in_cached_weeks():
+    # Sunday night into Monday crosses the Monday workweek boundary at midnight, but not at 19:00
+    work_periods = WorkPeriodIndex([(datetime(2024, 1, 7, 20), datetime(2024, 1, 8, 8), False),
+                                    (datetime(2024, 1, 9, 20), datetime(2024, 1, 10, 8), False)])
+    week_cache = LRUCache()
+    for _ in range(2):
+        _, total_hours, weekly_data, _ = calculate_total_earnings(
+            work_periods, *rates, daily_overtime_rules=((8, 1.5),), workday_start_hour=19, week_cache=week_cache
+        )
+        assert total_hours == 24
+        assert [week['overtime_hours'] for week in weekly_data] == [4, 4]
+        assert [week['week_start'] for week in weekly_data] == [datetime(2024, 1, 1, 19), datetime(2024, 1, 8, 19)]
+    assert week_cache.hits == 2
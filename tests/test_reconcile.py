@@ -0,0 +1,81 @@
+# Tests for paystub reconciliation
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from nurse_wage.pay import calculate_total_earnings
+from nurse_wage.reconcile import expected_pay_breakdown, read_pay_records, reconcile_pay_records
+
+# Function to price a week with three 12-hour day shifts and one on-call night (44 hours)
+def priced_week():
+    work_periods = [(datetime(2024, 1, day, 7), datetime(2024, 1, day, 19), False) for day in (1, 2, 3)]
+    work_periods.append((datetime(2024, 1, 4, 19), datetime(2024, 1, 5, 3), True))
+    return calculate_total_earnings(work_periods, 40.0, 0.0, 10.0, 0.0, 20.0, "Dollar Amount")
+
+def test_expected_breakdown_adds_up_to_total():
+    total_earnings, _, _, df_hours = priced_week()
+    df_expected = expected_pay_breakdown(df_hours).set_index('category')['expected_amount']
+    assert df_expected['total'] == pytest.approx(total_earnings)
+    assert df_expected.drop('total').sum() == pytest.approx(total_earnings)
+    assert df_expected['regular'] == pytest.approx(40 * 40.0)
+    assert df_expected['overtime'] == pytest.approx(4 * 40.0 * 1.5)
+
+def test_matching_records_are_not_flagged():
+    total_earnings, _, _, df_hours = priced_week()
+    df_expected = expected_pay_breakdown(df_hours)
+    df_records = pd.DataFrame({
+        'date': '2024-01-05',
+        'code': ['REG', 'OT', 'NIGHT', 'On Call', 'OTD'],
+        'amount': [df_expected.set_index('category')['expected_amount'][category]
+                   for category in ['regular', 'overtime', 'night_diff_pay', 'on_call_diff_pay',
+                                    'overtime_differentials']],
+        'hours': [40, 4, None, None, None],
+    })
+    df = reconcile_pay_records(df_records, df_hours)
+    assert not df['flagged'].any()
+    assert df.set_index('category')['actual_amount']['total'] == pytest.approx(total_earnings)
+
+def test_short_pay_and_unknown_codes_are_flagged():
+    _, _, _, df_hours = priced_week()
+    df_records = pd.DataFrame({
+        'date': ['2024-01-03', '2024-01-03'],
+        'code': ['REG', 'Bonus'],
+        'amount': [1500.0, 50.0],
+        'hours': [37.5, None],
+    })
+    df = reconcile_pay_records(df_records, df_hours).set_index('category')
+    assert df.loc['regular', 'difference'] == pytest.approx(-100.0)
+    assert df.loc['regular', 'hours_difference'] == pytest.approx(-2.5)
+    assert df.loc['bonus', 'flagged'] and df.loc['bonus', 'expected_amount'] == 0
+    assert df.loc['overtime', 'flagged']
+
+def test_read_pay_records(tmp_path):
+    path = tmp_path / 'pay.csv'
+    path.write_text('Date,Code,Amount\n2024-01-05,REG,100\n')
+    assert read_pay_records(path).columns.tolist() == ['date', 'code', 'amount']
+
+    (tmp_path / 'pay.txt').write_text('')
+    with pytest.raises(ValueError, match='must be a .csv'):
+        read_pay_records(tmp_path / 'pay.txt')
+    (tmp_path / 'short.csv').write_text('date,amount\n2024-01-05,100\n')
+    with pytest.raises(ValueError, match='code'):
+        read_pay_records(tmp_path / 'short.csv')
+
+def test_weeks_begin_at_workday_start_hour():
+    # With workdays starting at 19:00, a Monday day shift is in the week that began the Monday
+    # before at 19:00, and so is a pay record dated that Monday
+    work_periods = [(datetime(2024, 1, 8, 7), datetime(2024, 1, 8, 19), False),
+                    (datetime(2024, 1, 8, 19), datetime(2024, 1, 9, 7), False)]
+    _, _, weekly_data, df_hours = calculate_total_earnings(work_periods, 40.0, 0.0, 0.0, 0.0, 0.0, "Dollar Amount",
+                                                           workday_start_hour=19)
+    assert [week['week'] for week in weekly_data] == ['2024-01-01', '2024-01-08']
+    df_records = pd.DataFrame({
+        'date': ['2024-01-08', '2024-01-08 20:00'],
+        'code': ['REG', 'REG'],
+        'amount': [480.0, 480.0],
+        'hours': [12, 12],
+    })
+    df = reconcile_pay_records(df_records, df_hours, workday_start_hour=19)
+    assert not df['flagged'].any()
+    assert df['week'].unique().tolist() == ['2024-01-01', '2024-01-08']
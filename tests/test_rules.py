@@ -0,0 +1,75 @@
+# Tests for declarative differential rules
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from nurse_wage.pay import calculate_total_earnings
+from nurse_wage.rules import (DifferentialRule, RuleTable, default_rule_table, federal_holidays,
+                              parse_weekdays, rule_table_from_config)
+
+# Function to look up the hourly differential of each pay column at a time
+def rates_at(rules, time, is_on_call=False, hourly_rate=40.0, differential_type="Dollar Amount"):
+    combo = rules.combo_index(np.array([time], dtype='datetime64[m]'), np.array([is_on_call]))
+    return dict(zip(rules.names, rules.rate_table(hourly_rate, differential_type)[combo][0]))
+
+def test_parse_weekdays():
+    assert parse_weekdays('Fri, sat') == (4, 5)
+    assert parse_weekdays([6, '0']) == (0, 6)
+    assert parse_weekdays('') is None
+    with pytest.raises(ValueError):
+        parse_weekdays('Funday')
+
+def test_default_rules():
+    rules = default_rule_table(10.0, 5.0, 20.0)
+    assert rates_at(rules, datetime(2024, 1, 1, 12)) == {'night': 0, 'weekend': 0, 'on_call': 0}
+    assert rates_at(rules, datetime(2024, 1, 6, 20), is_on_call=True) == {'night': 10, 'weekend': 5, 'on_call': 20}
+    assert rates_at(rules, datetime(2024, 1, 2, 6, 59))['night'] == 10
+    assert rates_at(rules, datetime(2024, 1, 2, 7))['night'] == 0
+
+def test_percentage_amounts():
+    rules = default_rule_table(10.0, 5.0, 20.0)
+    rates = rates_at(rules, datetime(2024, 1, 6, 20), is_on_call=True, differential_type="Percentage")
+    assert rates == {'night': 4.0, 'weekend': 2.0, 'on_call': 8.0}
+
+def test_group_pays_highest_priority_rule():
+    rules = RuleTable([
+        DifferentialRule('night', 3.0, 19, 7, group='shift'),
+        DifferentialRule('late_night', 5.0, 23, 7, group='shift', priority=1),
+    ])
+    assert rates_at(rules, datetime(2024, 1, 1, 20))['night'] == 3
+    late = rates_at(rules, datetime(2024, 1, 2, 1))
+    assert (late['night'], late['late_night']) == (0, 5)
+
+def test_holiday_rules_from_config():
+    rules = rule_table_from_config({
+        'rules': [{'name': 'holiday', 'amount': 20, 'holidays': True},
+                  {'name': 'weekday', 'amount': 1, 'weekdays': 'Mon, Tue, Wed, Thu, Fri', 'holidays': False}],
+        'holidays': ['2024-12-24'],
+        'federal_holidays': True,
+    }, years=[2024])
+    assert date(2024, 12, 24) in rules.holiday_dates and date(2024, 12, 25) in rules.holiday_dates
+    assert rates_at(rules, datetime(2024, 12, 25, 9))['holiday'] == 20
+    assert rates_at(rules, datetime(2024, 12, 23, 9)) == {'night': 0, 'weekend': 0, 'on_call': 0, 'holiday': 0,
+                                                          'weekday': 1}
+    assert rates_at(rules, datetime(2024, 12, 30, 9))['weekday'] == 1
+
+def test_federal_holidays():
+    holidays = federal_holidays([2024])
+    assert len(holidays) == 11
+    assert date(2024, 11, 28) in holidays  # Thanksgiving
+    assert date(2024, 5, 27) in holidays  # Memorial Day
+
+def test_rule_window_splits_segments():
+    rules = RuleTable([DifferentialRule('late_night', 5.0, 23, 3)])
+    work_periods = [(datetime(2024, 1, 1, 21), datetime(2024, 1, 2, 5), False)]
+    total_earnings, total_hours, _, df_hours = calculate_total_earnings(
+        work_periods, 40.0, 0.0, 0.0, 0.0, 0.0, "Dollar Amount", rules=rules
+    )
+    assert total_hours == 8
+    assert df_hours['late_night_diff_pay'].sum() == pytest.approx(4 * 5.0)
+    assert total_earnings == pytest.approx(8 * 40.0 + 20.0)
+
+def test_equal_tables_hash_alike():
+    assert default_rule_table(1.0, 2.0, 3.0) == RuleTable(default_rule_table(1.0, 2.0, 3.0).rules)
+    assert hash(default_rule_table(1.0, 2.0, 3.0)) == hash(RuleTable(default_rule_table(1.0, 2.0, 3.0).rules))
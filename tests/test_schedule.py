@@ -0,0 +1,85 @@
+# Tests for the work period containers
+from datetime import datetime
+
+from nurse_wage.schedule import WorkPeriodIndex, apply_period_changes
+
+def shift(day, start_hour=7, end_hour=19, is_on_call=False):
+    return datetime(2024, 1, day, start_hour), datetime(2024, 1, day, end_hour), is_on_call
+
+def test_insert_keeps_periods_sorted_and_rejects_overlaps():
+    work_periods = WorkPeriodIndex()
+    assert work_periods.insert(shift(3))
+    assert work_periods.insert(shift(1))
+    assert not work_periods.insert(shift(3, 18, 20))
+    assert not work_periods.insert(shift(4, 19, 7))
+    assert list(work_periods) == [shift(1), shift(3)]
+
+def test_bulk_insert_drops_overlapping_new_periods():
+    work_periods = WorkPeriodIndex([shift(2)])
+    added = work_periods.bulk_insert([shift(4), shift(2, 8, 9), shift(3), shift(3, 18, 20), shift(5, 19, 23, True)])
+    assert added == [shift(3), shift(4), shift(5, 19, 23, True)]
+    assert list(work_periods) == [shift(2), shift(3), shift(4), shift(5, 19, 23, True)]
+
+def test_adjacent_periods_do_not_overlap():
+    work_periods = WorkPeriodIndex([shift(1, 7, 19)])
+    assert work_periods.insert(shift(1, 19, 23))
+    assert work_periods.insert(shift(1, 0, 7))
+    assert len(work_periods) == 3
+
+def test_remove_and_bulk_remove():
+    work_periods = WorkPeriodIndex([shift(day) for day in range(1, 6)])
+    assert work_periods.remove(*shift(2)[:2])
+    assert not work_periods.remove(*shift(2)[:2])
+    removed = work_periods.bulk_remove([shift(1)[:2], shift(4)[:2], shift(9)[:2]])
+    assert removed == [shift(1), shift(4)]
+    assert list(work_periods) == [shift(3), shift(5)]
+
+def test_span():
+    work_periods = WorkPeriodIndex([shift(day) for day in range(1, 6)])
+    assert work_periods.span(datetime(2024, 1, 2), datetime(2024, 1, 4)) == (1, 3)
+    assert work_periods.span() == (0, 5)
+    assert work_periods.span(datetime(2024, 1, 4), datetime(2024, 1, 2)) == (3, 3)
+
+def test_fingerprint_follows_contents():
+    work_periods = WorkPeriodIndex([shift(1)])
+    fingerprint = work_periods.fingerprint()
+    work_periods.insert(shift(2))
+    assert work_periods.fingerprint() != fingerprint
+    work_periods.remove(*shift(2)[:2])
+    assert work_periods.fingerprint() == fingerprint
+
+def test_apply_period_changes():
+    work_periods = WorkPeriodIndex([shift(day) for day in range(1, 5)])
+    removed, added, rejected = apply_period_changes(
+        work_periods, deleted=[shift(1)[:2]],
+        edited=[(shift(2)[:2], shift(2, 8, 20, True)), (shift(3)[:2], shift(4, 10, 12))],
+    )
+    # Moving the Jan 3 shift onto the Jan 4 shift is rejected and the old shift stays
+    assert rejected == [(shift(3)[:2], shift(4, 10, 12))]
+    assert sorted(removed) == [shift(1), shift(2)]
+    assert added == [shift(2, 8, 20, True)]
+    assert list(work_periods) == [shift(2, 8, 20, True), shift(3), shift(4)]
+
+def test_apply_period_changes_edit_into_own_slot():
+    work_periods = WorkPeriodIndex([shift(1), shift(2)])
+    removed, added, rejected = apply_period_changes(work_periods, [], [(shift(1)[:2], shift(1, 6, 18))])
+    assert (removed, added, rejected) == ([shift(1)], [shift(1, 6, 18)], [])
+    assert list(work_periods) == [shift(1, 6, 18), shift(2)]
+
+def test_apply_period_changes_two_edits_onto_one_slot():
+    work_periods = WorkPeriodIndex([shift(1), shift(2)])
+    removed, added, rejected = apply_period_changes(
+        work_periods, [], [(shift(1)[:2], shift(5)), (shift(2)[:2], shift(5))]
+    )
+    # Only the first edit can take the slot; the second shift is put back, not lost
+    assert added == [shift(5)]
+    assert rejected == [(shift(2)[:2], shift(5))]
+    assert removed == [shift(1)]
+    assert list(work_periods) == [shift(2), shift(5)]
+
+def test_insert_arrays_returns_mask_in_input_order():
+    from nurse_wage.schedule import as_period_arrays
+
+    work_periods = WorkPeriodIndex([shift(2)])
+    kept = work_periods.insert_arrays(*as_period_arrays([shift(4), shift(2, 8, 9), shift(3), shift(3, 19, 7)]))
+    assert kept.tolist() == [True, False, True, False]
@@ -0,0 +1,51 @@
+# Tests for the saved schedule store
+from datetime import datetime
+
+from nurse_wage.pay import calculate_total_earnings, week_digests
+from nurse_wage.schedule import WorkPeriodIndex
+from nurse_wage.store import ScheduleStore
+
+def shift(day, is_on_call=False):
+    return datetime(2024, 1, day, 19), datetime(2024, 1, day + 1, 7), is_on_call
+
+def test_profiles_and_ranges(tmp_path):
+    store = ScheduleStore(str(tmp_path / 'schedule.db'))
+    store.add_periods('jane', [shift(1), shift(3, True), shift(5)])
+    store.add_periods('jane', [shift(3, True)])
+    store.add_periods('sam', [shift(2)])
+    assert store.profiles() == ['jane', 'sam']
+    assert store.load_periods('jane') == [shift(1), shift(3, True), shift(5)]
+    # The Jan 1 night shift ends on Jan 2, so it overlaps the range
+    assert store.load_periods('jane', datetime(2024, 1, 2), datetime(2024, 1, 4)) == [shift(1), shift(3, True)]
+
+    store.remove_periods('jane', [shift(1)[:2]])
+    assert store.load_periods('jane') == [shift(3, True), shift(5)]
+    assert store.load_periods('sam') == [shift(2)]
+    store.close()
+
+def test_weekly_summaries_are_read_back_while_unchanged(tmp_path):
+    rates = (40.0, 0.0, 10.0, 5.0, 20.0, "Percentage")
+    overtime_rules = (0, 40, (), 19)
+    work_periods = WorkPeriodIndex([shift(1), shift(3, True), shift(9), shift(16)])
+    _, _, weekly_data, _ = calculate_total_earnings(work_periods, *rates, *overtime_rules)
+    digests = week_digests(work_periods, rates, overtime_rules)
+    assert len(digests) == 3
+
+    store = ScheduleStore(str(tmp_path / 'schedule.db'))
+    store.save_weekly_summaries('jane', weekly_data, digests)
+    assert store.load_weekly_summaries('jane', digests) == weekly_data
+    assert store.load_weekly_summaries('sam', digests) == []
+
+    # A changed shift or a changed rate only invalidates the weeks it touches
+    work_periods.remove(*shift(9)[:2])
+    work_periods.insert(shift(10))
+    changed = week_digests(work_periods, rates, overtime_rules)
+    assert store.load_weekly_summaries('jane', changed) == [weekly_data[0], weekly_data[2]]
+    assert store.load_weekly_summaries('jane', week_digests(work_periods, (41.0,) + rates[1:], overtime_rules)) == []
+
+    # Saving replaces the profile's weeks in the run's range, so the stale week is gone
+    _, _, changed_data, _ = calculate_total_earnings(work_periods, *rates, *overtime_rules)
+    store.save_weekly_summaries('jane', changed_data, changed)
+    assert store.load_weekly_summaries('jane', changed) == changed_data
+    assert store.load_weekly_summaries('jane', digests) == [weekly_data[0], weekly_data[2]]
+    store.close()
@@ -0,0 +1,46 @@
+# Tests for what-if rate sweeps
+from datetime import datetime, timedelta
+
+import pytest
+
+from nurse_wage.pay import calculate_total_earnings
+from nurse_wage.sweep import build_rate_grid, classify_hours, sweep_rates
+
+# Function to build a rotation of 12-hour day and night shifts, with on-call weekend shifts
+# and some weeks over 40 hours
+def rotation(weeks=6):
+    work_periods = []
+    day = datetime(2024, 1, 1)
+    for i in range(weeks * 7):
+        start = day + timedelta(days=i)
+        if i % 7 in (0, 1, 2):
+            work_periods.append((start.replace(hour=7), start.replace(hour=19), False))
+        elif i % 7 == 3 and i % 2:
+            work_periods.append((start.replace(hour=19), start.replace(hour=19) + timedelta(hours=12), False))
+        elif i % 7 == 5:
+            work_periods.append((start.replace(hour=9, minute=30), start.replace(hour=17), True))
+    return work_periods
+
+@pytest.mark.parametrize('differential_type', ["Percentage", "Dollar Amount"])
+@pytest.mark.parametrize('overtime_rules', [(0, 40, (), 0), (6, 36, ((8, 1.5), (12, 2.0)), 19)])
+def test_sweep_matches_calculate_total_earnings(differential_type, overtime_rules):
+    work_periods = rotation()
+    rate_grid = build_rate_grid([30.0, 45.5], [0.0, 2.0], [0.0, 10.0], 5.0, [0.0, 20.0])
+    df_classes = classify_hours(work_periods, *overtime_rules)
+    df_sweep, weekly_earnings = sweep_rates(df_classes, rate_grid, differential_type)
+
+    assert len(df_sweep) == 16
+    assert weekly_earnings.shape == (16, len(df_classes))
+    for row, rates in zip(df_sweep.itertuples(index=False), rate_grid.itertuples(index=False)):
+        total_earnings, total_hours, weekly_data, _ = calculate_total_earnings(
+            work_periods, *rates, differential_type, *overtime_rules
+        )
+        assert row.total_earnings == pytest.approx(float(total_earnings))
+    assert df_classes['regular_hours'].sum() + df_classes['overtime_hours'].sum() == pytest.approx(total_hours)
+    assert df_classes.index.tolist() == [week['week'] for week in weekly_data]
+
+def test_empty_schedule():
+    df_classes = classify_hours([])
+    df_sweep, weekly_earnings = sweep_rates(df_classes, build_rate_grid(40.0, 0.0, 0.0, 0.0, 0.0), "Dollar Amount")
+    assert df_sweep['total_earnings'].tolist() == [0.0]
+    assert weekly_earnings.shape == (1, 0)
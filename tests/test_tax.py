@@ -0,0 +1,27 @@
+# Tests for federal and state tax estimates
+import pytest
+
+from nurse_wage.tax import (build_tax_table, calculate_federal_tax, calculate_period_tax, federal_tax_brackets,
+                            get_federal_tax_table)
+
+# Function to calculate federal tax bracket by bracket, the way the original page did
+def bracket_tax(income, tax_brackets):
+    tax = 0.0
+    for lower_limit, upper_limit, rate in tax_brackets:
+        if income > lower_limit:
+            tax += (min(income, upper_limit) - lower_limit) * rate
+        else:
+            break
+    return tax
+
+@pytest.mark.parametrize('filing_status', list(federal_tax_brackets))
+def test_matches_bracket_by_bracket_tax(filing_status):
+    incomes = [0, 5000, 11000, 44725.5, 100000, 250000, 700000, 1500000]
+    expected = [bracket_tax(income, federal_tax_brackets[filing_status]) for income in incomes]
+    assert calculate_federal_tax(incomes, get_federal_tax_table(filing_status)).tolist() == pytest.approx(expected)
+
+def test_period_tax_is_annualized():
+    tax_table = build_tax_table(federal_tax_brackets['Single'])
+    federal_tax, state_tax = calculate_period_tax([2000.0], 26, tax_table, 5.0)
+    assert federal_tax[0] == pytest.approx(bracket_tax(52000, federal_tax_brackets['Single']) / 26)
+    assert state_tax[0] == pytest.approx(100.0)
@@ -0,0 +1,84 @@
+# Tests for unit-level schedule imports
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from nurse_wage.cache import LRUCache
+from nurse_wage.pay import calculate_total_earnings
+from nurse_wage.unit import calculate_unit_earnings, expand_uploads, import_unit_schedules
+
+rates = (40.0, 0.0, 0.0, 0.0, 0.0, "Dollar Amount")
+overtime_rules = (0, 40, (), 0)
+
+# Function to build the bytes of an .ics file with one event per (start, end) pair
+def ics(*periods):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0']
+    for start, end in periods:
+        lines += ['BEGIN:VEVENT', f'DTSTART:{start}', f'DTEND:{end}', 'SUMMARY:Shift', 'END:VEVENT']
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(lines) + '\r\n').encode()
+
+# Function to build the bytes of a zip file from (member name, bytes) pairs
+def zip_bytes(*members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+monday = ics(('20240101T070000', '20240101T190000'))
+tuesday = ics(('20240102T070000', '20240102T190000'))
+
+def test_expand_uploads_opens_zip_files():
+    archive = zip_bytes(('unit/Jane Doe.ics', monday), ('unit/notes.txt', b'notes'), ('unit/.hidden.ics', monday),
+                        ('__MACOSX/unit/._Jane Doe.ics', b'resource fork'))
+    ics_files, errors = expand_uploads([('unit.zip', archive), ('John.ics', tuesday), ('broken.zip', b'not a zip')])
+    assert [name for name, _ in ics_files] == ['unit.zip/unit/Jane Doe.ics', 'John.ics']
+    assert ics_files[0][1] == monday
+    assert [(error['file'], error['work_periods']) for error in errors] == [('broken.zip', 0)]
+    assert errors[0]['error']
+
+def test_report_has_an_entry_per_file():
+    uploads = [('Jane.ics', monday), ('empty.ics', ics()), ('garbage.ics', b'\xff\xfe not a calendar')]
+    schedules, report = import_unit_schedules(uploads)
+    assert list(schedules) == ['Jane']
+    assert [(entry['file'], entry['person'], entry['work_periods']) for entry in report] == [
+        ('Jane.ics', 'Jane', 1), ('empty.ics', 'empty', 0), ('garbage.ics', 'garbage', 0)
+    ]
+    assert report[0]['error'] is None
+    assert report[1]['error'] == 'No work periods found'
+    assert report[2]['error']
+
+def test_files_of_one_person_are_merged():
+    # The same shift exported twice is kept once; a person's files may be spread across zips
+    both = ics(('20240101T070000', '20240101T190000'), ('20240102T070000', '20240102T190000'))
+    uploads = [('a.zip', zip_bytes(('Jane.ics', monday))), ('b.zip', zip_bytes(('Jane.ics', both))),
+               ('John.ics', tuesday)]
+    schedules, report = import_unit_schedules(uploads)
+    assert sorted(schedules) == ['Jane', 'John']
+    assert list(schedules['Jane']) == [(datetime(2024, 1, 1, 7), datetime(2024, 1, 1, 19), False),
+                                       (datetime(2024, 1, 2, 7), datetime(2024, 1, 2, 19), False)]
+    assert [entry['work_periods'] for entry in report] == [1, 1, 1]
+
+def test_executor_and_cache_give_the_same_schedules():
+    uploads = [('Jane.ics', monday), ('John.ics', tuesday)]
+    expected, _ = import_unit_schedules(uploads)
+    cache = LRUCache(maxsize=8)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for _ in range(2):
+            schedules, _ = import_unit_schedules(uploads, executor, cache=cache)
+            assert {person: list(schedule) for person, schedule in schedules.items()} == \
+                {person: list(schedule) for person, schedule in expected.items()}
+    assert len(cache) == 2
+
+def test_unit_total_adds_up_people():
+    schedules, _ = import_unit_schedules([('Jane.ics', monday), ('John.ics', tuesday)])
+    results, unit_total = calculate_unit_earnings(schedules, rates, overtime_rules)
+    assert [result['person'] for result in results] == ['Jane', 'John']
+    total_earnings, _, _, _ = calculate_total_earnings(list(schedules['Jane']), *rates, *overtime_rules)
+    assert results[0]['total_earnings'] == pytest.approx(float(total_earnings))
+    assert unit_total == {'people': 2, 'work_periods': 2, 'total_hours': 24.0,
+                          'total_earnings': pytest.approx(2 * float(total_earnings))}
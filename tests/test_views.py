@@ -0,0 +1,48 @@
+# Tests for the chart data and calendar view
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from nurse_wage.pay import calculate_total_earnings
+from nurse_wage.views import build_calendar_html, choose_chart_granularity, get_daily_totals, prepare_chart_data
+
+# Function to price one 12-hour day shift a week for the given number of weeks
+def priced_weeks(weeks):
+    work_periods = [(datetime(2024, 1, 1, 7) + timedelta(weeks=i), datetime(2024, 1, 1, 19) + timedelta(weeks=i), False)
+                    for i in range(weeks)]
+    return calculate_total_earnings(work_periods, 40.0, 2.0, 0.0, 0.0, 0.0, "Dollar Amount")
+
+def test_granularity_keeps_bars_under_the_limit():
+    assert choose_chart_granularity(date(2024, 1, 1), date(2025, 12, 22)) == 'Week'
+    assert choose_chart_granularity(date(2024, 1, 1), date(2026, 1, 5)) == 'Month'
+    assert choose_chart_granularity(date(2024, 1, 1), date(2024, 12, 30), max_bars=11) == 'Year'
+
+def test_chart_sums_weeks_into_periods():
+    total_earnings, _, weekly_data, _ = priced_weeks(10)
+    df_weeks = prepare_chart_data(weekly_data)
+    assert df_weeks['period'].nunique() == 10
+    # Only non-zero earning types are sent to the chart
+    assert set(df_weeks['Earning Type']) == {'Base Pay', 'Charge Nurse Pay'}
+
+    df_months = prepare_chart_data(weekly_data, 'Month')
+    assert df_months['period'].unique().tolist() == ['2024-01', '2024-02', '2024-03']
+    assert df_months['Amount'].sum() == pytest.approx(total_earnings)
+    base_pay = df_months[df_months['Earning Type'] == 'Base Pay'].set_index('period')['Amount']
+    assert base_pay.tolist() == [5 * 480.0, 4 * 480.0, 1 * 480.0]
+
+def test_calendar_spans_first_to_last_worked_month():
+    html = build_calendar_html([date(2024, 1, 31), date(2024, 3, 1)])
+    assert [month in html for month in ('January 2024', 'February 2024', 'March 2024', 'April 2024')] == \
+        [True, True, True, False]
+    assert html.count('font-weight: bold') == 2
+    assert build_calendar_html([]) == ""
+
+def test_calendar_shades_days_by_their_totals():
+    _, _, _, df_hours = priced_weeks(1)
+    daily_totals = get_daily_totals(df_hours)
+    assert daily_totals == {date(2024, 1, 1): (12.0, pytest.approx(504.0))}
+    daily_totals[date(2024, 1, 2)] = (3.0, 126.0)
+    html = build_calendar_html(daily_totals)
+    assert 'title="12 hours, $504.00">1</td>' in html
+    # The busiest day gets the darkest shade, and a quarter of it a light one
+    assert 'background-color: #2eb82e' in html and 'background-color: #b2ecb2' in html